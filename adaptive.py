@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+自适应采集间隔模块 - 按观察到的数据变化调整平台的采集间隔
+
+每个指标单独维护一个间隔，从固定模式的间隔开始：数据没有变化时按倍数退避，
+检测到变化时收紧，始终限制在最小和最大间隔之间。平台的采集间隔取所跟踪指标中最短的间隔。
+"""
+
+import time
+
+# 数据不变时每次间隔乘以的倍数
+DEFAULT_BACKOFF = 2.0
+# 数据变化时间隔除以的倍数
+DEFAULT_TIGHTEN = 4.0
+
+
+class AdaptiveInterval:
+    """单个平台的自适应采集间隔"""
+
+    def __init__(self, min_interval, max_interval, base_interval, metrics,
+                 backoff=DEFAULT_BACKOFF, tighten=DEFAULT_TIGHTEN):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        # 固定间隔模式下使用的间隔，用于计算节省的请求数
+        self.base_interval = base_interval
+        self.backoff = backoff
+        self.tighten = tighten
+
+        self.last_values = {metric: None for metric in metrics}
+        # 从固定间隔开始，开启自适应模式不会先提高请求频率
+        self.intervals = {metric: self._clamp(base_interval) for metric in metrics}
+        self.polls = 0
+        self.started = None
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def observe(self, values, now=None):
+        """记录一次采集的结果，返回下次采集前的间隔（秒）"""
+        now = time.monotonic() if now is None else now
+        if self.started is None:
+            self.started = now
+        self.polls += 1
+
+        for metric, last in self.last_values.items():
+            value = values.get(metric)
+            if value is None:
+                continue
+            if last is not None:
+                if value != last:
+                    self.intervals[metric] = self._clamp(self.intervals[metric] / self.tighten)
+                else:
+                    self.intervals[metric] = self._clamp(self.intervals[metric] * self.backoff)
+            self.last_values[metric] = value
+        return self.interval()
+
+    def interval(self):
+        """当前的采集间隔"""
+        return min(self.intervals.values()) if self.intervals else self.max_interval
+
+    def savings(self, now=None):
+        """
+        与固定间隔相比的请求统计
+
+        返回:
+            dict: 实际请求数、固定间隔下的请求数和节省的比例（最大为 1，请求比固定间隔多时为负数）
+        """
+        now = time.monotonic() if now is None else now
+        if self.started is None:
+            return {"polls": 0, "fixed_polls": 0, "saved": 0.0}
+        # 第一次请求两种模式都会发出
+        fixed_polls = 1 + int((now - self.started) // self.base_interval)
+        saved = 1 - self.polls / fixed_polls
+        return {"polls": self.polls, "fixed_polls": fixed_polls, "saved": saved}
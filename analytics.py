@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增长分析模块 - 单次遍历或增量计算每日/每周增量、增长率、移动平均和趋势预测
+"""
+
+import math
+import heapq
+from bisect import bisect_right
+from collections import deque
+from data_store import read_history, get_utc_offset, FOLLOWER_METRICS
+
+DAY_SECONDS = 24 * 3600
+
+# 默认的滚动窗口天数
+DEFAULT_WINDOW_DAYS = 7
+# 趋势预测使用最近多少天的数据
+DEFAULT_PROJECTION_DAYS = 30
+
+
+class GrowthTracker:
+    """
+    单个指标的增长统计
+
+    数据点按时间顺序逐个加入，每个点的更新代价为 O(1)。只保存每天最后一个值
+    （日收盘值），趋势预测使用最近 projection_days 天收盘值的线性回归累加量，
+    加入新数据点时增量维护。
+    """
+
+    def __init__(self, utc_offset=0, window_days=DEFAULT_WINDOW_DAYS,
+                 projection_days=DEFAULT_PROJECTION_DAYS):
+        self.utc_offset = utc_offset
+        self.window_days = window_days
+        self.projection_days = projection_days
+
+        self.latest = None
+        self.latest_ts = None
+        self.count = 0
+
+        # 日收盘值: 本地日序号列表和对应的值
+        self.days = []
+        self.closes = []
+
+        # 回归窗口及其累加量: n, Σx, Σy, Σxx, Σxy，以及对数值的 Σln(y), Σx·ln(y)
+        self._fit = deque()
+        self._sums = [0, 0.0, 0.0, 0.0, 0.0]
+        self._log_sums = [0, 0.0, 0.0, 0.0, 0.0]
+
+    def _update_fit(self, day, value, sign):
+        x = float(day)
+        for sums, y in ((self._sums, float(value)),
+                        (self._log_sums, math.log(value) if value > 0 else None)):
+            if y is None:
+                continue
+            sums[0] += sign
+            sums[1] += sign * x
+            sums[2] += sign * y
+            sums[3] += sign * x * x
+            sums[4] += sign * x * y
+
+    def add(self, ts, value):
+        """加入一个数据点（UTC 纪元秒），早于最新数据点的点会被忽略"""
+        if self.latest_ts is not None and ts < self.latest_ts:
+            return False
+
+        day = (ts + self.utc_offset) // DAY_SECONDS
+        if self.days and self.days[-1] == day:
+            # 同一天内只保留最后一个值
+            self.closes[-1] = value
+            self._update_fit(*self._fit.pop(), -1)
+        else:
+            self.days.append(day)
+            self.closes.append(value)
+
+        self._fit.append((day, value))
+        self._update_fit(day, value, 1)
+        while self._fit[0][0] <= day - self.projection_days:
+            self._update_fit(*self._fit.popleft(), -1)
+
+        self.latest = value
+        self.latest_ts = ts
+        self.count += 1
+        return True
+
+    def _close_before(self, day):
+        """day 之前（不含）最近一天的收盘值"""
+        index = bisect_right(self.days, day - 1)
+        return self.closes[index - 1] if index else None
+
+    def _close_at_or_before(self, day):
+        index = bisect_right(self.days, day)
+        return self.closes[index - 1] if index else None
+
+    def day_delta(self):
+        """今天相对于上一个有数据的日子的增量"""
+        if not self.days:
+            return None
+        previous = self._close_before(self.days[-1])
+        return None if previous is None else self.latest - previous
+
+    def window_delta(self, days=None):
+        """最近 days 天的增量"""
+        days = days or self.window_days
+        if not self.days:
+            return None
+        base = self._close_at_or_before(self.days[-1] - days)
+        return None if base is None else self.latest - base
+
+    def growth_rate(self, days=None):
+        """最近 days 天的增长率（百分比）"""
+        days = days or self.window_days
+        if not self.days:
+            return None
+        base = self._close_at_or_before(self.days[-1] - days)
+        if not base:
+            return None
+        return (self.latest - base) / base * 100
+
+    def average_daily_growth(self, days=None):
+        """最近 days 天平均每天的增量"""
+        days = days or self.window_days
+        delta = self.window_delta(days)
+        return None if delta is None else delta / days
+
+    def moving_average(self, days=None):
+        """最近 days 天日收盘值的移动平均"""
+        days = days or self.window_days
+        if not self.days:
+            return None
+        start = bisect_right(self.days, self.days[-1] - days)
+        window = self.closes[start:]
+        return sum(window) / len(window)
+
+    def daily_deltas(self):
+        """每天的增量: [(本地日序号, 增量)]，缺失的日子的增长计入下一个有数据的日子"""
+        return [(self.days[i], self.closes[i] - self.closes[i - 1]) for i in range(1, len(self.days))]
+
+    def weekly_deltas(self):
+        """每周（周一开始）的增量: [(周起始的本地日序号, 增量)]"""
+        weeks = []
+        for day, value in zip(self.days, self.closes):
+            # 纪元第0天是周四，加3后按7取整得到周一开始的周
+            week = (day + 3) // 7 * 7 - 3
+            if weeks and weeks[-1][0] == week:
+                weeks[-1][1] = value
+            else:
+                weeks.append([week, value])
+        return [(weeks[i][0], weeks[i][1] - weeks[i - 1][1]) for i in range(1, len(weeks))]
+
+    def project(self, days_ahead, method="linear"):
+        """按最近 projection_days 天的趋势预测 days_ahead 天后的值"""
+        sums = self._sums if method == "linear" else self._log_sums
+        n, sx, sy, sxx, sxy = sums
+        if n < 2 or not self.days:
+            return None
+        denominator = n * sxx - sx * sx
+        if denominator == 0:
+            return None
+        slope = (n * sxy - sx * sy) / denominator
+        intercept = (sy - slope * sx) / n
+        y = intercept + slope * (self.days[-1] + days_ahead)
+        if method == "linear":
+            return y
+        try:
+            return math.exp(y)
+        except OverflowError:
+            return None
+
+    def summary(self, projection_ahead=DEFAULT_PROJECTION_DAYS):
+        """汇总结果，供页面和菜单栏显示"""
+        return {
+            "latest": self.latest,
+            "latest_ts": self.latest_ts,
+            "day_delta": self.day_delta(),
+            "week_delta": self.window_delta(7),
+            "growth_rate": self.growth_rate(),
+            "average_daily_growth": self.average_daily_growth(),
+            "moving_average": self.moving_average(),
+            "projection_days": projection_ahead,
+            "projection_linear": self.project(projection_ahead, "linear"),
+            "projection_exponential": self.project(projection_ahead, "exponential"),
+        }
+
+
+def _tagged(index, pairs):
+    for ts, value in pairs:
+        yield ts, index, value
+
+
+def merge_series(series, bucket_size=None, offset=0):
+    """
+    将多个按时间排序的序列对齐合并，逐个产生 (时间戳, 总数, 各序列占比)
+
+    各序列通过 k 路归并按时间顺序遍历一次，每个时间点取各序列在该时间点
+    之前（含）的最新值（as-of 对齐），总数增量维护，不需要逐点查找其他序列。
+    从所有序列都有值的时间点开始输出。
+
+    参数:
+        series: {名称: [(时间戳, 值), ...]}，每个序列按时间排序
+        bucket_size: 对齐的时间粒度，与时间戳单位相同；为 None 时在每个出现过的时间点输出
+        offset: 划分时间段时加到时间戳上的偏移（时区偏移）
+
+    返回:
+        生成器，按时间顺序产生 (时间戳或时间段起点, 总数, 占比元组)，占比顺序与 series 相同
+    """
+    streams = [_tagged(index, pairs) for index, pairs in enumerate(series.values())]
+    latest = [None] * len(streams)
+    missing = len(streams)
+    total = 0
+    current = None
+
+    def row():
+        ts = current if bucket_size is None else current * bucket_size - offset
+        shares = tuple(value / total if total else 0.0 for value in latest)
+        return ts, total, shares
+
+    for ts, index, value in heapq.merge(*streams):
+        key = ts if bucket_size is None else (ts + offset) // bucket_size
+        if key != current:
+            # 上一个时间点（段）的值已经确定
+            if current is not None and not missing:
+                yield row()
+            current = key
+        previous = latest[index]
+        if previous is None:
+            missing -= 1
+            previous = 0
+        total += value - previous
+        latest[index] = value
+
+    if current is not None and not missing:
+        yield row()
+
+
+def analyze_history(history, metrics=None, utc_offset=0, **kwargs):
+    """对 read_history 的结果做一次遍历，返回 {指标: GrowthTracker}"""
+    metrics = metrics or [key for key in history if key != "timestamp"]
+    trackers = {metric: GrowthTracker(utc_offset, **kwargs) for metric in metrics}
+    columns = [(trackers[metric], history[metric]) for metric in metrics]
+    for i, ts in enumerate(history["timestamp"]):
+        for tracker, values in columns:
+            tracker.add(ts, values[i])
+    return trackers
+
+
+def analyze_platform(platform, metrics=None, data_dir=None, **kwargs):
+    """读取平台历史数据（只读取需要的列）并计算增长统计"""
+    history = read_history(platform, metrics, data_dir)
+    return analyze_history(history, metrics, get_utc_offset(data_dir), **kwargs)
+
+
+def format_growth(summary):
+    """将增长统计格式化为简短文本，例如 "今日+3 · 7天+12 · 30天后≈250" """
+    def signed(value):
+        return "-" if value is None else f"{value:+d}"
+
+    text = f"今日{signed(summary['day_delta'])} · 7天{signed(summary['week_delta'])}"
+    if summary["projection_linear"] is not None:
+        text += f" · {summary['projection_days']}天后≈{round(summary['projection_linear'])}"
+    return text
+
+
+def follower_growth(platform, data_dir=None):
+    """平台粉丝数的增长统计"""
+    metric = FOLLOWER_METRICS[platform]
+    return analyze_platform(platform, [metric], data_dir)[metric]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异常检测模块 - 在写入数据时检测抓取错误导致的异常值
+
+对每个指标的相邻变化量维护一个固定大小的滚动窗口，用中位数和 MAD（中位数绝对偏差）
+判断新值的变化是否异常。内存占用固定，不需要重新扫描历史数据。
+"""
+
+from collections import deque
+
+# 滚动窗口大小（变化量个数）
+DEFAULT_WINDOW = 30
+# 偏离中位数超过多少倍尺度视为异常
+DEFAULT_THRESHOLD = 6.0
+# 尺度下限：绝对值和相对当前值的比例，避免数据长期不变时 MAD 为0导致任何变化都被判为异常
+DEFAULT_ABSOLUTE_FLOOR = 10
+DEFAULT_RELATIVE_FLOOR = 0.02
+# 连续多少次得到相近的"异常"值时认为是真实的跳变
+DEFAULT_CONFIRMATIONS = 3
+
+# MAD 换算为标准差的系数
+MAD_SCALE = 1.4826
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class StreamingOutlierDetector:
+    """单个指标的滚动中位数/MAD 异常检测"""
+
+    def __init__(self, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD,
+                 absolute_floor=DEFAULT_ABSOLUTE_FLOOR, relative_floor=DEFAULT_RELATIVE_FLOOR,
+                 confirmations=DEFAULT_CONFIRMATIONS):
+        self.threshold = threshold
+        self.absolute_floor = absolute_floor
+        self.relative_floor = relative_floor
+        self.confirmations = confirmations
+        self.deltas = deque(maxlen=window)
+        self.last = None
+        self.pending = []
+
+    def seed(self, values):
+        """用最近的正常数据初始化"""
+        for value in values:
+            self._accept(value)
+
+    def _accept(self, value):
+        if self.last is not None:
+            self.deltas.append(value - self.last)
+        self.last = value
+        self.pending = []
+
+    def _limits(self):
+        """返回 (变化量中位数, 允许的最大偏离)"""
+        if self.deltas:
+            median = _median(self.deltas)
+            mad = _median([abs(delta - median) for delta in self.deltas])
+        else:
+            median, mad = 0, 0
+        scale = max(MAD_SCALE * mad, self.absolute_floor, self.relative_floor * abs(self.last))
+        return median, self.threshold * scale
+
+    def is_outlier(self, value):
+        """判断新值是否异常，不改变检测器状态"""
+        if self.last is None:
+            return False
+        median, limit = self._limits()
+        if abs(value - self.last - median) <= limit:
+            return False
+        # 与之前被隔离的值一致，并且已经连续出现足够多次，认为是真实的跳变
+        if self.pending and abs(value - self.pending[-1]) <= limit:
+            return len(self.pending) + 1 < self.confirmations
+        return True
+
+    def record(self, value, accepted):
+        """记录检测结果，accepted 为 False 的值只用于确认跳变"""
+        if accepted:
+            self._accept(value)
+            return
+        if self.last is None:
+            return
+        _, limit = self._limits()
+        if self.pending and abs(value - self.pending[-1]) <= limit:
+            self.pending.append(value)
+            # 只需要保留最近的几个值
+            del self.pending[:-self.confirmations]
+        else:
+            self.pending = [value]
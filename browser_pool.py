@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浏览器进程池 - 每个工作进程拥有一个浏览器，浏览器平台的采集在工作进程中执行
+
+每个工作进程在自己的进程组中运行，浏览器和它的渲染进程都属于这个进程组，不在应用的进程树中：
+- 工作进程打开的页面数达到上限，或者进程组的内存（RSS，通过 ps 读取）超过上限时，
+  工作进程连同浏览器一起被回收并重新启动
+- 工作进程崩溃时自动重新启动，并重新执行一次当前的采集
+- 采集超时的工作进程连同浏览器一起被结束
+
+工作进程在第一次需要时才启动，空闲超过 idle_timeout 秒后连同浏览器一起关闭，
+两次浏览器采集之间不占用浏览器的内存。
+"""
+
+import os
+import time
+import signal
+import threading
+import subprocess
+import multiprocessing
+
+import resilience
+
+# 每个工作进程打开多少个页面后回收
+DEFAULT_MAX_PAGES = 50
+# 工作进程（包括浏览器）的内存上限（MB），超过后回收
+DEFAULT_MAX_RSS_MB = 1024
+# 单次采集的超时（秒），超时的工作进程被结束
+DEFAULT_TASK_TIMEOUT = 5 * 60
+# 工作进程空闲多久后关闭（秒）
+DEFAULT_IDLE_TIMEOUT = 5 * 60
+# 停止工作进程时等待它关闭浏览器的时间（秒）
+STOP_TIMEOUT = 15
+# 截止时间过后再等待工作进程自己结束采集的时间（秒），之后结束工作进程
+DEADLINE_GRACE = 10
+# 等待采集结果时检查取消的间隔（秒）
+POLL_INTERVAL = 1
+
+
+class BrowserWorkerError(Exception):
+    """工作进程中的采集出错、超时或工作进程反复崩溃"""
+
+
+def process_group_rss(pgid):
+    """
+    进程组中所有进程的内存（RSS）之和（字节）
+
+    工作进程崩溃后留下的浏览器进程仍在同一个进程组中，也会被计入
+    """
+    output = subprocess.run(["ps", "-A", "-o", "pgid=,rss="],
+                            capture_output=True, text=True, check=True).stdout
+    total = 0
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 2 and int(fields[0]) == pgid:
+            total += int(fields[1])
+    return total * 1024
+
+
+def _kill_group(pgid):
+    """结束进程组中的所有进程，包括工作进程退出后没有关闭的浏览器"""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _worker_main(conn):
+    """工作进程：启动浏览器，逐个执行采集任务直到收到 None"""
+    # 以自己的 pid 作为进程组，浏览器进程也属于这个组，主进程据此统计内存和结束浏览器
+    os.setpgid(0, 0)
+    # Ctrl+C 由主进程处理，工作进程由主进程停止
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import collectors
+    from toutiao import init_browser
+
+    page = init_browser()
+    try:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            platform, url, account, seconds = task
+            try:
+                # 截止时间以剩余秒数传入，在工作进程中重新计时
+                deadline = resilience.Deadline(seconds)
+                result = ("ok", collectors.extract(platform, url, page, account, deadline))
+            except resilience.DeadlineExceeded:
+                # 主进程按同样的位置记录预算用完
+                result = ("deadline", deadline.exceeded_where)
+            except resilience.LocalLimitError as e:
+                # 本机限流，主进程不计为平台失败
+                result = ("limited", str(e))
+            except Exception as e:
+                result = ("error", f"{type(e).__name__}: {e}")
+            conn.send(result)
+    except EOFError:
+        # 主进程已退出
+        pass
+    finally:
+        if page is not None:
+            try:
+                page.quit()
+            except Exception as e:
+                print(f"关闭浏览器时出错: {e}")
+
+
+class _Worker:
+    """一个工作进程及其统计"""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pages = 0
+        self.total_pages = 0
+        self.rss = 0
+        self.restarts = 0
+        self.recycles = 0
+        self.idle_stops = 0
+        # 最近一次采集结束的时间
+        self.last_used = None
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, context):
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,),
+                                       name=f"browser-worker-{self.index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.pages = 0
+        self.rss = 0
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """让工作进程关闭浏览器后退出，不响应时强制结束"""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        """强制结束工作进程和浏览器"""
+        if self.process is None:
+            return
+        # 工作进程已经退出时浏览器可能还在运行
+        _kill_group(self.process.pid)
+        self.process.join(1)
+        self.conn.close()
+        self.process = None
+        self.conn = None
+        self.rss = 0
+
+
+def describe_stats(stats):
+    """工作进程统计（BrowserPool.stats() 的结果）的简短文字说明"""
+    running = sum(1 for item in stats if item["pid"] is not None)
+    rss = sum(item["rss_mb"] for item in stats)
+    restarts = sum(item["restarts"] for item in stats)
+    return f"{running}个进程, {rss:.0f}MB, 重启{restarts}次"
+
+
+def from_settings(app_settings, size=1):
+    """按应用设置中的上限创建 size 个工作进程的进程池"""
+    return BrowserPool(
+        size,
+        max_pages=app_settings.get("browser_max_pages", DEFAULT_MAX_PAGES),
+        max_rss_mb=app_settings.get("browser_max_rss_mb", DEFAULT_MAX_RSS_MB),
+        task_timeout=app_settings.get("browser_task_timeout", DEFAULT_TASK_TIMEOUT),
+        idle_timeout=app_settings.get("browser_idle_timeout", DEFAULT_IDLE_TIMEOUT),
+    )
+
+
+class BrowserPool:
+    """浏览器工作进程池，run() 在空闲的工作进程中执行一次浏览器平台的采集"""
+
+    def __init__(self, size=1, max_pages=DEFAULT_MAX_PAGES, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 task_timeout=DEFAULT_TASK_TIMEOUT, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        参数:
+            size: 工作进程数（同时使用的浏览器数）
+            idle_timeout: 工作进程空闲多少秒后关闭，为 None 或 0 时不关闭
+        """
+        self.max_pages = max_pages
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.task_timeout = task_timeout
+        self.idle_timeout = idle_timeout
+        # 主进程有多个线程，用 spawn 启动工作进程，不继承锁和浏览器连接
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(index) for index in range(max(1, size))]
+        # 空闲的工作进程，最近使用的在最后，优先复用已经启动的浏览器
+        self._idle = list(reversed(self._workers))
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._reaper = None
+        self._closed = False
+
+    def run(self, platform, url, account=None, deadline=None):
+        """
+        在空闲的工作进程中采集一个浏览器平台账号，所有工作进程都在忙时等待
+
+        没有运行中的工作进程时先启动一个。工作进程按 deadline 的剩余时间采集；
+        deadline 被取消或过期后工作进程仍未返回时，结束工作进程并抛出 resilience.DeadlineExceeded。
+        采集出错、超时或工作进程连续崩溃时抛出 BrowserWorkerError
+        """
+        deadline = deadline or resilience.Deadline()
+        with self._lock:
+            while not self._idle and not self._closed:
+                self._changed.wait(deadline.remaining())
+                deadline.check("等待空闲的浏览器工作进程")
+            if self._closed:
+                raise BrowserWorkerError("浏览器进程池已关闭")
+            worker = self._idle.pop()
+        try:
+            return self._run_on(worker, (platform, url, account), deadline)
+        finally:
+            with self._lock:
+                worker.last_used = time.monotonic()
+                self._idle.append(worker)
+                self._start_reaper()
+                self._changed.notify_all()
+
+    def _start_reaper(self):
+        # 第一次有工作进程空闲时启动唯一的回收线程
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap_idle, name="browser-reaper")
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap_idle(self):
+        """回收线程：睡眠到最早的空闲工作进程超时，关闭超时的工作进程"""
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    deadlines = [worker.last_used + self.idle_timeout for worker in self._idle if worker.alive()]
+                    if deadlines and min(deadlines) <= now:
+                        break
+                    # 没有运行中的空闲工作进程时一直等待，直到有工作进程被放回
+                    self._changed.wait(min(deadlines) - now if deadlines else None)
+                expired = [worker for worker in self._idle
+                           if worker.alive() and worker.last_used + self.idle_timeout <= now]
+                # 关闭期间不让采集使用这些工作进程
+                for worker in expired:
+                    self._idle.remove(worker)
+
+            for worker in expired:
+                print(f"浏览器工作进程 {worker.index} 空闲超过 {self.idle_timeout} 秒，关闭浏览器")
+                worker.stop()
+                worker.idle_stops += 1
+            with self._lock:
+                # 放在最前面，之后优先使用仍在运行的工作进程
+                self._idle[:0] = expired
+                self._changed.notify_all()
+
+    def _run_on(self, worker, task, deadline):
+        # 工作进程在采集过程中崩溃时重新启动并重试一次
+        for attempt in range(2):
+            deadline.check("等待浏览器工作进程")
+            if not worker.alive():
+                if worker.process is not None:
+                    print(f"浏览器工作进程 {worker.index} 已退出 (exitcode={worker.process.exitcode})，重新启动")
+                    worker.kill()
+                    worker.restarts += 1
+                worker.start(self._context)
+
+            try:
+                worker.conn.send(task + (deadline.remaining(),))
+                if not self._wait_result(worker, deadline):
+                    worker.kill()
+                    worker.restarts += 1
+                    if deadline.expired():
+                        raise deadline.exceeded("浏览器工作进程")
+                    raise BrowserWorkerError(f"采集超时 ({self.task_timeout}秒)")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                # 工作进程在采集过程中崩溃，下一轮循环重新启动
+                continue
+
+            worker.pages += 1
+            worker.total_pages += 1
+            self._check_recycle(worker)
+            if status == "deadline":
+                raise deadline.exceeded(value)
+            if status == "limited":
+                raise resilience.LocalLimitError(value)
+            if status == "error":
+                raise BrowserWorkerError(value)
+            return value
+        raise BrowserWorkerError("浏览器工作进程连续崩溃")
+
+    def _wait_result(self, worker, deadline):
+        """等待工作进程返回结果，超时或 deadline 取消、过期后仍未返回时返回 False"""
+        limit = time.monotonic() + self.task_timeout
+        expired_since = None
+        while not worker.conn.poll(POLL_INTERVAL):
+            now = time.monotonic()
+            if now >= limit:
+                print(f"浏览器工作进程 {worker.index} 采集超过 {self.task_timeout} 秒，结束进程")
+                return False
+            if deadline.cancelled():
+                print(f"浏览器工作进程 {worker.index} 的采集已取消，结束进程")
+                return False
+            if deadline.expired():
+                # 工作进程按同样的截止时间采集，通常会自己结束；给它一点时间保存结果
+                expired_since = expired_since or now
+                if now - expired_since >= DEADLINE_GRACE:
+                    print(f"浏览器工作进程 {worker.index} 超出时间预算后仍未结束，结束进程")
+                    return False
+        return True
+
+    def _check_recycle(self, worker):
+        """页面数或内存超过上限时回收工作进程"""
+        try:
+            worker.rss = process_group_rss(worker.process.pid)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"无法读取浏览器工作进程的内存: {e}")
+        if worker.pages >= self.max_pages:
+            reason = f"已打开 {worker.pages} 个页面"
+        elif worker.rss > self.max_rss:
+            reason = f"内存 {worker.rss / 1024 / 1024:.0f}MB 超过上限"
+        else:
+            return
+        print(f"回收浏览器工作进程 {worker.index}: {reason}")
+        # 下次采集时再启动新的工作进程
+        worker.stop()
+        worker.recycles += 1
+
+    def stats(self):
+        """各工作进程的内存、页面数和重启次数"""
+        return [
+            {
+                "index": worker.index,
+                "pid": worker.process.pid if worker.alive() else None,
+                "rss_mb": round(worker.rss / 1024 / 1024, 1),
+                "pages": worker.pages,
+                "total_pages": worker.total_pages,
+                "restarts": worker.restarts,
+                "recycles": worker.recycles,
+                "idle_stops": worker.idle_stops,
+            }
+            for worker in self._workers
+        ]
+
+    def describe(self):
+        """进程池状态的简短文字说明"""
+        return describe_stats(self.stats())
+
+    def close(self):
+        """停止所有工作进程并关闭浏览器"""
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+        for worker in self._workers:
+            worker.stop()
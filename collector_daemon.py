@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+采集守护进程 - 不依赖 macOS 菜单栏，在 Linux 服务器上按计划采集所有账号
+
+与菜单栏应用使用相同的调度器、数据存储和提取器。事件流服务（默认端口 8765）
+除了 /events 之外还提供:
+
+    GET  /status   调度任务、熔断器、浏览器工作进程和采集速度
+    GET  /latest   各账号最近一次采集到的完整数据
+    POST /refresh  立即采集所有账号
+
+菜单栏应用启动时如果发现守护进程在运行，就只从 /latest 读取数据，不再自己采集。
+
+用法: python collector_daemon.py
+"""
+
+import os
+import json
+import time
+import signal
+import functools
+import threading
+from urllib.request import Request, urlopen
+
+import browser_pool
+import collectors
+import event_stream
+import resilience
+import scheduler
+import settings
+
+# 守护进程只监听本机
+DAEMON_HOST = "127.0.0.1"
+# 客户端请求守护进程的超时（秒）
+CLIENT_TIMEOUT = 2
+# 输出采集速度的间隔（秒）
+REPORT_INTERVAL = 60
+
+
+class CollectorDaemon:
+    """按计划采集所有账号，并通过 HTTP 接口提供状态和最新数据"""
+
+    def __init__(self, config=None, app_settings=None):
+        self.config = config or collectors.load_config()
+        self.app_settings = app_settings or settings.load_settings()
+        self.accounts = collectors.load_accounts(self.config)
+        self.port = self.app_settings.get("event_stream_port", event_stream.DEFAULT_PORT)
+        self.scheduler = scheduler.Scheduler(group_limits=collectors.slot_limits(self.app_settings))
+        # 浏览器平台在独立的工作进程中采集，浏览器按需启动，空闲后关闭
+        self.browser_pool = browser_pool.from_settings(
+            self.app_settings, collectors.slot_limits(self.app_settings)["browser"])
+
+        self._lock = threading.Lock()
+        # 采集任务名称 -> 最近一次采集到的完整数据
+        self._latest = {}
+        self._stopped = threading.Event()
+        self.started_at = None
+
+    def collect_account(self, platform, account, url, deadline=None):
+        """采集一个账号，推送新数据点并记录为最新数据，由调度器在工作线程中调用"""
+        name = collectors.job_name(platform, account)
+        try:
+            # 每次都重新采集，只共享进行中的采集
+            data = collectors.collect(platform, url, account=account, pool=self.browser_pool,
+                                      deadline=deadline, ttl=0)
+        except (resilience.CircuitOpenError, resilience.DeadlineExceeded, resilience.LocalLimitError) as e:
+            print(f"[{name}] {e}")
+            return
+        if not data or not data.get("data_complete"):
+            print(f"[{name}] 数据不完整或获取失败")
+            return
+        if data.get("cached"):
+            # 与另一次采集共享的结果，已经记录过
+            return
+
+        event_stream.publish_sample(platform, data, account)
+        if data.get("quarantined"):
+            # 疑似采集错误的数据不作为最新数据提供
+            print(f"[{name}] 数据异常 ({', '.join(data['quarantined'])})")
+            return
+        with self._lock:
+            self._latest[name] = {
+                "platform": platform,
+                "account": account,
+                "data": data,
+                "collected_at": time.time(),
+            }
+
+    def latest(self):
+        """GET /latest: {采集任务名称: {platform, account, data, collected_at}}"""
+        with self._lock:
+            return dict(self._latest)
+
+    def status(self):
+        """GET /status: 调度任务统计、熔断器状态、浏览器工作进程和采集速度"""
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at if self.started_at else 0,
+            "accounts": len(self.accounts),
+            "throughput": self.scheduler.throughput(),
+            "jobs": self.scheduler.stats(),
+            "breakers": resilience.breaker_states(),
+            "browser_workers": self.browser_pool.stats(),
+        }
+
+    def refresh(self):
+        """POST /refresh: 立即采集所有账号"""
+        self.scheduler.trigger()
+        return {"triggered": len(self.accounts)}
+
+    def start(self):
+        """启动 HTTP 接口和调度线程，端口被占用时返回 False"""
+        event_stream.add_route("/status", self.status)
+        event_stream.add_route("/latest", self.latest)
+        event_stream.add_route("/refresh", self.refresh, method="POST")
+        if event_stream.start_server(self.port, DAEMON_HOST) is None:
+            # 端口被占用，通常是菜单栏应用或另一个守护进程已经在采集
+            return False
+
+        for platform, account, url in self.accounts:
+            info = collectors.COLLECTORS[platform]
+            self.scheduler.add_job(
+                collectors.job_name(platform, account),
+                functools.partial(self.collect_account, platform, account, url),
+                collectors.effective_interval(platform, self.app_settings),
+                priority=info["priority"],
+                group=info["kind"],
+                budget=collectors.effective_budget(platform, self.app_settings),
+            )
+        self.started_at = time.time()
+        self.scheduler.start()
+        print(f"采集守护进程已启动，共 {len(self.accounts)} 个账号: http://{DAEMON_HOST}:{self.port}/status")
+        return True
+
+    def stop(self):
+        """请求 run_forever() 退出，可以在信号处理函数中调用"""
+        self._stopped.set()
+
+    def run_forever(self):
+        """启动并一直运行，直到 stop() 被调用"""
+        if not self.start():
+            return False
+        try:
+            while not self._stopped.wait(REPORT_INTERVAL):
+                print(f"采集速度: {self.scheduler.throughput():.1f} 账号/分钟")
+        finally:
+            self.scheduler.shutdown()
+            self.browser_pool.close()
+            event_stream.stop_server()
+            print("采集守护进程已停止")
+        return True
+
+
+def daemon_url(port=event_stream.DEFAULT_PORT):
+    return f"http://{DAEMON_HOST}:{port}"
+
+
+def request_json(path, port=event_stream.DEFAULT_PORT, method="GET", timeout=CLIENT_TIMEOUT):
+    """
+    请求守护进程的接口
+
+    连接失败时抛出 OSError（包括 urllib.error.URLError），返回内容无效时抛出 ValueError
+    """
+    if method == "POST":
+        # 守护进程只接受 JSON 类型的 POST 请求
+        request = Request(daemon_url(port) + path, data=b"{}", method=method,
+                          headers={"Content-Type": "application/json"})
+    else:
+        request = Request(daemon_url(port) + path, method=method)
+    with urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def is_running(port=event_stream.DEFAULT_PORT):
+    """本机是否有守护进程在运行（菜单栏应用自己的事件流服务没有 /status 接口）"""
+    try:
+        return "jobs" in request_json("/status", port)
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    daemon = CollectorDaemon()
+    # systemd 等进程管理器用 SIGTERM 停止服务
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: daemon.stop())
+    if not daemon.run_forever():
+        print(f"端口 {daemon.port} 已被占用，可能已有采集进程在运行")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
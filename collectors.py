@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+采集器注册表 - 各平台的采集函数、配置项和默认调度参数
+
+每个平台可以配置多个账号：config.env 中 <平台>_URL 为默认账号，
+<平台>_URL_<名称> 为名为 <名称> 的其他账号，例如 CSDN_URL_ALICE。
+
+同一个账号同时只有一次采集：采集进行中时再次请求会等待并共享它的结果，
+刚完成的完整结果在 ttl 秒内直接返回（命令行查询默认为 RESULT_TTL）。调度器的周期性任务
+以 ttl=0 调用，只共享进行中的采集，否则较短的采集间隔会被结果缓存覆盖。
+共享的结果带有 "cached": True，调用方据此避免重复推送和统计同一个数据点。
+"""
+
+import os
+import re
+import time
+import threading
+
+from data_store import FOLLOWER_METRICS, DEFAULT_ACCOUNT
+import resilience
+
+# kind: "http" 为直接请求页面的平台，开销小；"browser" 为需要浏览器渲染的平台，开销大
+# min_interval: 最短采集间隔（秒），浏览器平台即使设置了更短的间隔也不会更频繁地采集
+# priority: 同时到期时数值小的先执行
+# budget: 单次采集的时间预算（秒），可在设置 platform_budgets 中覆盖
+COLLECTORS = {
+    "csdn": {
+        "name": "CSDN",
+        "config_key": "CSDN_URL",
+        "kind": "http",
+        "min_interval": 5,
+        "priority": 0,
+        "budget": 60,
+    },
+    "juejin": {
+        "name": "掘金",
+        "config_key": "JUEJIN_URL",
+        "kind": "http",
+        "min_interval": 5,
+        "priority": 0,
+        "budget": 60,
+    },
+    "toutiao": {
+        "name": "头条",
+        "config_key": "TOUTIAO_URL",
+        "kind": "browser",
+        "min_interval": 5 * 60,
+        "priority": 1,
+        "budget": 3 * 60,
+    },
+    "zhihu": {
+        "name": "知乎",
+        "config_key": "ZHIHU_URL",
+        "kind": "browser",
+        "min_interval": 5 * 60,
+        "priority": 1,
+        "budget": 3 * 60,
+    },
+}
+
+
+# 默认的并发上限：HTTP 平台可以同时采集多个账号，浏览器平台同一时间只使用一个浏览器
+DEFAULT_SLOTS = {
+    "http": 4,
+    "browser": 1,
+}
+
+# 完整采集结果的默认缓存时间（秒），用于命令行等一次性查询；周期性采集任务不使用
+RESULT_TTL = 30
+
+# 账号名称只允许字母、数字、下划线和连字符（用作目录名）
+ACCOUNT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def load_config():
+    """从配置文件加载URL"""
+    config = {
+        "CSDN_URL": "https://blog.csdn.net/qq_34598061",  # 默认URL
+        "TOUTIAO_URL": "https://www.toutiao.com/c/user/token/MS4wLjABAAAA-vxeZNtd-323uOaHVG-qQJnP0kL3_QSOTO85-9GJPXo/",  # 默认URL
+        "JUEJIN_URL": "https://juejin.cn/user/3799544245529837/posts",  # 默认URL
+        "ZHIHU_URL": "https://www.zhihu.com/people/bu-yi-jue-63"  # 默认URL
+    }
+    
+    # 尝试读取配置文件
+    try:
+        config_file = 'config.env'
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        key, value = line.split('=', 1)
+                        config[key.strip()] = value.strip()
+            print(f"已从{config_file}加载配置")
+    except Exception as e:
+        print(f"无法加载配置文件: {e}")
+    
+    return config
+
+
+def load_accounts(config):
+    """
+    从配置中找出所有账号
+
+    返回:
+        list: [(平台, 账号, URL)]，按平台注册顺序和账号名称排序
+    """
+    accounts = []
+    for platform, info in COLLECTORS.items():
+        prefix = info["config_key"]
+        found = {}
+        for key, url in config.items():
+            if not url:
+                continue
+            if key == prefix:
+                found[DEFAULT_ACCOUNT] = url
+            elif key.startswith(prefix + "_"):
+                name = key[len(prefix) + 1:].lower()
+                if ACCOUNT_NAME_PATTERN.match(name) and name != DEFAULT_ACCOUNT:
+                    found[name] = url
+                else:
+                    print(f"忽略无效的账号配置: {key}")
+        for account in sorted(found, key=lambda name: (name != DEFAULT_ACCOUNT, name)):
+            accounts.append((platform, account, found[account]))
+    return accounts
+
+
+def job_name(platform, account=DEFAULT_ACCOUNT):
+    """账号的采集任务名称，默认账号为平台名称"""
+    if not account or account == DEFAULT_ACCOUNT:
+        return platform
+    return f"{platform}:{account}"
+
+
+def slot_limits(app_settings):
+    """HTTP 和浏览器采集任务各自的并发上限"""
+    return {
+        "http": max(1, app_settings.get("http_slots", DEFAULT_SLOTS["http"])),
+        "browser": max(1, app_settings.get("browser_slots", DEFAULT_SLOTS["browser"])),
+    }
+
+
+class _Flight:
+    """一次进行中的采集，等待者共享它的结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+# 采集任务名称 -> (完成时间, 完整的采集结果)
+_results = {}
+_flights_lock = threading.Lock()
+
+
+def collect(platform, url, page=None, account=DEFAULT_ACCOUNT, pool=None, deadline=None, ttl=RESULT_TTL):
+    """
+    通过账号的熔断器采集一个平台账号的数据
+
+    page 为浏览器平台可复用的浏览器实例；指定 pool（browser_pool.BrowserPool）时
+    浏览器平台在进程池的工作进程中采集。deadline（resilience.Deadline）限制采集的总时间。
+    同一账号的采集正在进行时等待并共享其结果，ttl 秒内完成的完整结果直接返回（带 "cached": True）。
+    熔断器打开时抛出 resilience.CircuitOpenError；没有得到完整数据记为一次失败
+    """
+    name = job_name(platform, account)
+    with _flights_lock:
+        cached = _results.get(name)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return dict(cached[1], cached=True)
+        flight = _flights.get(name)
+        leader = flight is None
+        if leader:
+            flight = _flights[name] = _Flight()
+
+    if not leader:
+        print(f"[{name}] 采集正在进行，等待其结果")
+        remaining = deadline.remaining() if deadline is not None else None
+        if not flight.done.wait(remaining):
+            raise deadline.exceeded("等待进行中的采集")
+        if flight.error is not None:
+            raise flight.error
+        return dict(flight.result, cached=True) if flight.result else flight.result
+
+    try:
+        flight.result = _guarded_collect(name, platform, url, page, account, pool, deadline)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            if _is_complete(flight.result):
+                _results[name] = (time.monotonic(), flight.result)
+            del _flights[name]
+        flight.done.set()
+
+
+def _guarded_collect(name, platform, url, page, account, pool, deadline):
+    if pool is not None and COLLECTORS[platform]["kind"] == "browser":
+        return resilience.guarded_call(name, pool.run, platform, url, account, deadline, succeeded=_is_complete)
+    return resilience.guarded_call(name, extract, platform, url, page, account, deadline, succeeded=_is_complete)
+
+
+def _is_complete(data):
+    return bool(data and data.get("data_complete"))
+
+
+def extract(platform, url, page=None, account=DEFAULT_ACCOUNT, deadline=None):
+    """
+    调用平台的提取器（不经过熔断器）
+
+    提取器模块（以及 requests、BeautifulSoup、DrissionPage）在第一次采集该平台时才导入，
+    菜单栏应用启动时不需要加载它们，浏览器平台只在工作进程中加载。
+    """
+    if platform == "csdn":
+        from csdn import extract_csdn_stats
+        return extract_csdn_stats(url, account, deadline)
+    if platform == "juejin":
+        from juejin import extract_juejin_stats
+        return extract_juejin_stats(url, account, deadline)
+    if platform == "toutiao":
+        from toutiao import parse_toutiao_user_stats
+        return parse_toutiao_user_stats(url, page, account, deadline)
+    if platform == "zhihu":
+        from zhihu import extract_zhihu_stats
+        return extract_zhihu_stats(url, page, account=account, deadline=deadline)
+    raise ValueError(f"未知平台: {platform}")
+
+
+def adaptive_metrics(platform, app_settings):
+    """自适应间隔模式下判断平台数据是否变化的指标，默认为粉丝数"""
+    return app_settings.get("adaptive_metrics", {}).get(platform, [FOLLOWER_METRICS[platform]])
+
+
+def effective_budget(platform, app_settings):
+    """平台单次采集的时间预算（秒）"""
+    return app_settings.get("platform_budgets", {}).get(platform, COLLECTORS[platform]["budget"])
+
+
+def effective_interval(platform, app_settings):
+    """平台的采集间隔：单独设置的间隔优先，否则使用全局间隔，且不小于平台的最短间隔"""
+    interval = app_settings.get("platform_intervals", {}).get(platform, app_settings.get("update_interval"))
+    return max(interval or COLLECTORS[platform]["min_interval"], COLLECTORS[platform]["min_interval"])
@@ -1,30 +1,45 @@
 import requests
 import re
-import datetime
 from bs4 import BeautifulSoup
 import os
+import data_store
+import rate_limit
+import resilience
 
-def fetch_page(url, headers=None):
-    """Fetch the page content using requests library"""
+def _get(url, headers, deadline):
+    # 每次尝试（包括重试）都占用该域名的请求额度
+    rate_limit.acquire(url, deadline=deadline)
+    response = requests.get(url, headers=headers, timeout=deadline.timeout(10, "请求页面"))
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_page(url, headers=None, deadline=None):
+    """Fetch the page content using requests library, retrying transient errors with backoff within deadline"""
     if headers is None:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
             'Referer': 'https://blog.csdn.net/'
         }
 
+    deadline = deadline or resilience.Deadline()
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return resilience.retry(_get, url, headers, deadline,
+                                retry_on=(requests.exceptions.RequestException,), deadline=deadline)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching the page: {e}")
         return None
 
 
-def extract_csdn_stats(url):
-    """Extract visitor, original, follower and following counts from CSDN HTML content"""
+def extract_csdn_stats(url, account=None, deadline=None):
+    """Extract visitor, original, follower and following counts from CSDN HTML content
+
+    The sample is saved under the given account (the default account when None).
+    Waits are bounded by deadline (a resilience.Deadline) when given; resilience.DeadlineExceeded
+    and rate_limit.RateLimitExceeded (our own rate limit) are raised instead of returning an error sample.
+    """
     try:
-        html_content = fetch_page(url)
+        html_content = fetch_page(url, deadline=deadline)
         if not html_content:
             raise ValueError("No HTML content to parse")
 
@@ -76,48 +91,48 @@ def extract_csdn_stats(url):
         following_count = re.sub(
             r'[^\d]', '', following_count) if following_count else "0"
 
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ts = data_store.now_epoch()
+        timestamp = data_store.format_timestamp(ts)
         
         # 验证数据是否有效（非零值）
         data_complete = all(
             int(x) > 0 for x in [visitor_count, original_count, follower_count, following_count]
         )
         
+        quarantined = []
         if data_complete:
-            # 确保data目录存在
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # 构建CSV文件路径
-            csv_file = os.path.join(data_dir, 'csdn_stats.csv')
-            
-            # 检查文件是否存在，决定是否写入标题行
-            file_exists = os.path.isfile(csv_file)
-            
             # 将数据保存到CSV文件
-            with open(csv_file, 'a', encoding='utf-8') as f:
-                if not file_exists:
-                    f.write("更新时间,总访问量,原创,粉丝数,关注数\n")
-                f.write(
-                    f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{visitor_count},{original_count},{follower_count},{following_count}\n")
+            csv_file, quarantined = data_store.append_sample("csdn", {
+                "visitors": visitor_count,
+                "originals": original_count,
+                "followers": follower_count,
+                "following": following_count,
+            }, ts, account=account)
 
             print(f"\n数据已保存到 {os.path.abspath(csv_file)}")
         else:
             print("\nCSND数据不完整或有数据项为0，未保存到CSV文件。所有数据项必须大于0才能保存。")
             
         return {
+            "ts": ts,
             "timestamp": timestamp,
             "visitors": visitor_count,
             "originals": original_count,
             "followers": follower_count,
             "following": following_count,
             "site": "CSDN",
-            "data_complete": data_complete
+            "data_complete": data_complete,
+            "quarantined": quarantined
         }
+    except (resilience.DeadlineExceeded, resilience.LocalLimitError):
+        # 超时、取消和本机限流不是 CSDN 出错，不返回错误数据
+        raise
     except Exception as e:
         print(f"Error extracting CSDN data: {e}")
+        ts = data_store.now_epoch()
         return {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": ts,
+            "timestamp": data_store.format_timestamp(ts),
             "visitors": "Error",
             "originals": "Error",
             "followers": "Error",
@@ -6,126 +6,224 @@
 """
 
 import os
-import csv
 import json
+import glob
+import string
+import hashlib
+import urllib.request
 import webbrowser
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from operator import itemgetter
+import event_stream
+import settings
+from analytics import analyze_history, format_growth, merge_series
+from data_store import (PLATFORMS, FOLLOWER_METRICS, DATA_DIR, data_file, read_history,
+                        get_utc_offset, format_timestamp)
 
-def read_csv_data(file_path):
-    """读取CSV数据文件"""
-    if not os.path.exists(file_path):
-        return [], []
-        
-    timestamps = []
-    values = []
-    
+# 数据块目录（相对于分析页面）
+CHUNK_DIR_NAME = "fans_chunks"
+
+# 各平台合并后的总粉丝数数据块名称
+TOTAL_CHUNK = "total"
+
+# 数据块时间窗口: 名称 -> (天数, 聚合粒度)，天数为0表示全部数据
+CHUNK_WINDOWS = {
+    "7d": (7, None),      # 最近7天原始数据
+    "30d": (30, "hour"),  # 最近30天按小时聚合
+    "all": (0, "day"),    # 全部数据按天聚合
+}
+
+# 聚合粒度对应的毫秒数
+BUCKET_MS = {
+    "hour": 3600 * 1000,
+    "day": 24 * 3600 * 1000,
+}
+
+# 单条曲线超过该点数时启用采样、渐进渲染并关闭平滑
+LARGE_DATA_THRESHOLD = 5000
+
+# 窗口大小变化时重绘图表的防抖时间（毫秒）
+RESIZE_DEBOUNCE_MS = 150
+
+# 图表库版本，升级时修改此处即可让本地缓存失效
+ECHARTS_VERSION = "5.4.3"
+ECHARTS_CDN_URL = f"https://cdn.jsdelivr.net/npm/echarts@{ECHARTS_VERSION}/dist/echarts.min.js"
+# 图表库文件 (dist/echarts.min.js) 的 SHA-256，升级版本时一起修改；内容不符的文件不会被使用
+ECHARTS_SHA256 = "1156429a16a38cb8604dcc6518c19406d4226142d908f8edd2e3531443c54d19"
+# 随应用分发的图表库，生成页面时无需联网下载
+ECHARTS_VENDOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vendor', f'echarts-{ECHARTS_VERSION}.min.js')
+# 本地缓存目录（相对于分析页面）
+ASSETS_DIR_NAME = "assets"
+
+def ensure_chart_runtime(data_dir):
+    """确保图表库已缓存到分析页面旁边，返回页面中引用的地址"""
+    assets_dir = os.path.join(data_dir, ASSETS_DIR_NAME)
+    manifest_file = os.path.join(assets_dir, 'manifest.json')
+
+    manifest = {}
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            # 跳过标题行
-            next(reader)
-            
-            for row in reader:
-                if len(row) > 0:
-                    # 将时间戳和数值添加到列表中
-                    timestamps.append(row[0])  # 时间戳在第一列
-                    # 根据文件类型读取对应的数据列
-                    if 'csdn' in file_path.lower():
-                        values.append(row[3])  # CSDN 粉丝数在第四列
-                    elif 'toutiao' in file_path.lower():
-                        values.append(row[2])  # 头条粉丝数在第三列
-                    elif 'juejin' in file_path.lower():
-                        values.append(row[4])  # 掘金粉丝数在第五列
-                    elif 'zhihu' in file_path.lower():
-                        values.append(row[5])  # 知乎粉丝数在第六列
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    # 已缓存校验过的相同文件时直接使用，不再读取或下载
+    entry = manifest.get("echarts")
+    if entry and entry.get("sha256") == ECHARTS_SHA256 and \
+            os.path.exists(os.path.join(assets_dir, entry["file"])):
+        return f"{ASSETS_DIR_NAME}/{entry['file']}"
+
+    try:
+        if os.path.exists(ECHARTS_VENDOR_FILE):
+            with open(ECHARTS_VENDOR_FILE, 'rb') as f:
+                content = f.read()
+        else:
+            print(f"正在下载图表库 echarts {ECHARTS_VERSION}...")
+            with urllib.request.urlopen(ECHARTS_CDN_URL, timeout=15) as response:
+                content = response.read()
+
+        digest = hashlib.sha256(content).hexdigest()
+        if digest != ECHARTS_SHA256:
+            raise ValueError(f"图表库校验失败 (SHA-256 {digest})")
+
+        # 文件名带内容哈希，内容变化时浏览器不会使用旧缓存
+        file_name = f"echarts-{ECHARTS_VERSION}.{digest[:12]}.min.js"
+        os.makedirs(assets_dir, exist_ok=True)
+        tmp_file = os.path.join(assets_dir, file_name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_file, os.path.join(assets_dir, file_name))
+
+        # 清理旧版本
+        for old_file in glob.glob(os.path.join(assets_dir, 'echarts-*.min.js')):
+            if os.path.basename(old_file) != file_name:
+                os.remove(old_file)
+
+        manifest["echarts"] = {"version": ECHARTS_VERSION, "sha256": digest, "file": file_name}
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        print(f"图表库已缓存到 {os.path.join(assets_dir, file_name)}")
+        return f"{ASSETS_DIR_NAME}/{file_name}"
     except Exception as e:
-        print(f"读取 {file_path} 时出错: {e}")
-        
-    return timestamps, values
+        # 无法缓存时退回到 CDN，页面仍然可以在联网时使用
+        print(f"缓存图表库失败，使用CDN地址: {e}")
+        return ECHARTS_CDN_URL
 
-def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
-    """生成包含 echarts 图表的 HTML 页面"""
-    
-    # 提取数据
-    csdn_timestamps, csdn_values = csdn_data
-    toutiao_timestamps, toutiao_values = toutiao_data
-    juejin_timestamps, juejin_values = juejin_data
-    zhihu_timestamps, zhihu_values = zhihu_data
-    
-    # 为了保持图表数据的完整性，找到所有数据集的时间戳
-    all_timestamps = csdn_timestamps + toutiao_timestamps + juejin_timestamps + zhihu_timestamps
-    
-    # 如果没有数据，返回错误提示页面
-    if not all_timestamps:
-        return generate_error_html("没有找到数据，请确保已经收集了足够的数据点。")
-    
-    # 预处理数据，确保数字格式正确，并转换时间戳为日期对象
-    csdn_data_pairs = []
-    for i, ts in enumerate(csdn_timestamps):
-        try:
-            # 解析时间戳
-            dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            value = int(csdn_values[i]) if csdn_values[i].isdigit() else 0
-            csdn_data_pairs.append([dt.strftime("%Y-%m-%d %H:%M:%S"), value])
-        except (ValueError, IndexError):
-            continue
-            
-    toutiao_data_pairs = []
-    for i, ts in enumerate(toutiao_timestamps):
-        try:
-            # 解析时间戳
-            dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            value = int(toutiao_values[i]) if toutiao_values[i].isdigit() else 0
-            toutiao_data_pairs.append([dt.strftime("%Y-%m-%d %H:%M:%S"), value])
-        except (ValueError, IndexError):
-            continue
-    
-    juejin_data_pairs = []
-    for i, ts in enumerate(juejin_timestamps):
-        try:
-            # 解析时间戳
-            dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            value = int(juejin_values[i]) if juejin_values[i].isdigit() else 0
-            juejin_data_pairs.append([dt.strftime("%Y-%m-%d %H:%M:%S"), value])
-        except (ValueError, IndexError):
-            continue
-            
-    zhihu_data_pairs = []
-    for i, ts in enumerate(zhihu_timestamps):
-        try:
-            # 解析时间戳
-            dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            value = int(zhihu_values[i]) if zhihu_values[i].isdigit() else 0
-            zhihu_data_pairs.append([dt.strftime("%Y-%m-%d %H:%M:%S"), value])
-        except (ValueError, IndexError):
-            continue
-    
-    # 计算百分比变化（基于所有数据）
-    csdn_values_int = [pair[1] for pair in csdn_data_pairs]
-    toutiao_values_int = [pair[1] for pair in toutiao_data_pairs]
-    juejin_values_int = [pair[1] for pair in juejin_data_pairs]
-    zhihu_values_int = [pair[1] for pair in zhihu_data_pairs]
-    
-    csdn_change = calculate_change(csdn_values_int)
-    toutiao_change = calculate_change(toutiao_values_int)
-    juejin_change = calculate_change(juejin_values_int)
-    zhihu_change = calculate_change(zhihu_values_int)
-    
-    # 准备 echarts 数据
-    csdn_data_json = json.dumps(csdn_data_pairs)
-    toutiao_data_json = json.dumps(toutiao_data_pairs)
-    juejin_data_json = json.dumps(juejin_data_pairs)
-    zhihu_data_json = json.dumps(zhihu_data_pairs)
-    
-    # 生成 HTML
-    html = f"""
+def to_data_pairs(history, metric):
+    """将 read_history 返回的某个指标转换为按时间排序的 [毫秒时间戳, 整数值] 数据点"""
+    data_pairs = [[ts * 1000, value] for ts, value in zip(history["timestamp"], history[metric])]
+    # 数据通常已按时间顺序写入，排序只是保证顺序
+    data_pairs.sort(key=itemgetter(0))
+    return data_pairs
+
+def aggregate_pairs(data_pairs, bucket, utc_offset=0):
+    """按数据时区的小时或天聚合数据点，每个时间段保留最后一个值"""
+    size = BUCKET_MS[bucket]
+    offset = utc_offset * 1000
+    aggregated = []
+    last_key = None
+    for ts, value in data_pairs:
+        key = (ts + offset) // size
+        if key == last_key:
+            aggregated[-1][1] = value
+        else:
+            aggregated.append([key * size - offset, value])
+            last_key = key
+    return aggregated
+
+def build_chunks(data_pairs, utc_offset=0):
+    """按时间窗口生成预聚合的数据块，窗口以最新数据点为终点，相同数据总是得到相同结果"""
+    chunks = {}
+    end = data_pairs[-1][0] if data_pairs else None
+    for window, (days, bucket) in CHUNK_WINDOWS.items():
+        pairs = data_pairs
+        if days and end is not None:
+            # 数据已按时间排序，二分查找窗口起点（[t] 排在所有 [t, 值] 之前）
+            start = bisect_left(pairs, [end - days * BUCKET_MS["day"]])
+            pairs = pairs[start:]
+        if bucket:
+            pairs = aggregate_pairs(pairs, bucket, utc_offset)
+        chunks[window] = pairs
+    return chunks
+
+def build_total_chunks(platform_pairs, utc_offset=0):
+    """
+    将各平台数据按时间对齐合并为总粉丝数数据块，窗口和聚合粒度与 build_chunks 相同
+
+    每个数据点为 [毫秒时间戳, 总粉丝数, 各平台占比...]，占比按 PLATFORMS 顺序，没有数据的平台占比为0
+    """
+    series = {platform: pairs for platform, pairs in platform_pairs.items() if pairs}
+    names = list(series)
+    chunks = {}
+    for window, (days, bucket) in CHUNK_WINDOWS.items():
+        size = BUCKET_MS[bucket] if bucket else None
+        rows = []
+        for ts, total, shares in merge_series(series, size, utc_offset * 1000):
+            share_of = dict(zip(names, shares))
+            rows.append([ts, total] + [round(share_of.get(platform, 0), 4) for platform in PLATFORMS])
+        if days and rows:
+            start = bisect_left(rows, [rows[-1][0] - days * BUCKET_MS["day"]])
+            rows = rows[start:]
+        chunks[window] = rows
+    return chunks
+
+def write_chunks(chunk_dir, platform, chunks):
+    """将数据块写成可通过 <script> 加载的文件（file:// 页面无法使用 fetch）"""
+    os.makedirs(chunk_dir, exist_ok=True)
+    for window, pairs in chunks.items():
+        chunk_file = os.path.join(chunk_dir, f"{platform}_{window}.js")
+        with open(chunk_file, 'w', encoding='utf-8') as f:
+            f.write(f"fansChunkLoaded({json.dumps(platform)}, {json.dumps(window)}, {json.dumps(pairs)});\n")
+
+def chunks_exist(chunk_dir, platform):
+    """检查平台的所有数据块文件是否存在"""
+    return all(os.path.exists(os.path.join(chunk_dir, f"{platform}_{window}.js")) for window in CHUNK_WINDOWS)
+
+def summarize_pairs(data_pairs, growth=None):
+    """页面统计卡片所需的数据摘要，growth 为 analytics.GrowthTracker"""
+    values = [pair[1] for pair in data_pairs]
+    return {
+        "latest": values[-1] if values else None,
+        "change": calculate_change(values),
+        "updated_at": data_pairs[-1][0] if data_pairs else None,
+        "growth": growth.summary() if growth and growth.count else None,
+    }
+
+def data_fingerprint(file_path):
+    """数据文件的版本指纹（修改时间和大小），文件不存在时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def load_report_state(state_file):
+    """读取上次生成分析页面时记录的状态"""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def compile_template(text):
+    """预先解析模板，得到 (文本, 字段名) 片段列表，渲染时无需再次解析"""
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(text)]
+
+def render_template(compiled, fields):
+    """用字段值渲染预先解析的模板"""
+    return ''.join(literal + (str(fields[field]) if field is not None else '')
+                   for literal, field in compiled)
+
+# 分析页面模板（与 str.format 语法相同，{{ 和 }} 表示字面的花括号）
+PAGE_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>粉丝数据分析</title>
-    <script src="https://cdn.jsdelivr.net/npm/echarts@5.4.3/dist/echarts.min.js"></script>
+    <script src="{chart_runtime_src}"></script>
     <style>
         body {{
             font-family: 'PingFang SC', 'Helvetica Neue', Arial, sans-serif;
@@ -211,6 +309,11 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
             margin-top: 5px;
             font-size: 14px;
         }}
+        .stat-growth {{
+            margin-top: 5px;
+            font-size: 12px;
+            color: #888;
+        }}
         .positive {{
             color: #4caf50;
         }}
@@ -267,29 +370,33 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
     <div class="container">
         <div class="header">
             <h1>平台粉丝数据分析</h1>
-            <p>数据更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}</p>
+            <p>数据更新时间: {updated_at}</p>
         </div>
         
         <div class="stats-container">
             <div class="stat-card">
                 <div class="stat-title">CSDN 粉丝</div>
-                <div class="stat-value">{csdn_values_int[-1] if csdn_values_int else 'N/A'}</div>
-                <div class="stat-change {get_change_class(csdn_change)}">{format_change(csdn_change)}</div>
+                <div class="stat-value" id="csdn-value">{csdn_value}</div>
+                <div class="stat-change {csdn_change_class}">{csdn_change_text}</div>
+                <div class="stat-growth">{csdn_growth_text}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-title">头条粉丝</div>
-                <div class="stat-value">{toutiao_values_int[-1] if toutiao_values_int else 'N/A'}</div>
-                <div class="stat-change {get_change_class(toutiao_change)}">{format_change(toutiao_change)}</div>
+                <div class="stat-value" id="toutiao-value">{toutiao_value}</div>
+                <div class="stat-change {toutiao_change_class}">{toutiao_change_text}</div>
+                <div class="stat-growth">{toutiao_growth_text}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-title">掘金粉丝</div>
-                <div class="stat-value">{juejin_values_int[-1] if juejin_values_int else 'N/A'}</div>
-                <div class="stat-change {get_change_class(juejin_change)}">{format_change(juejin_change)}</div>
+                <div class="stat-value" id="juejin-value">{juejin_value}</div>
+                <div class="stat-change {juejin_change_class}">{juejin_change_text}</div>
+                <div class="stat-growth">{juejin_growth_text}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-title">知乎粉丝</div>
-                <div class="stat-value">{zhihu_values_int[-1] if zhihu_values_int else 'N/A'}</div>
-                <div class="stat-change {get_change_class(zhihu_change)}">{format_change(zhihu_change)}</div>
+                <div class="stat-value" id="zhihu-value">{zhihu_value}</div>
+                <div class="stat-change {zhihu_change_class}">{zhihu_change_text}</div>
+                <div class="stat-growth">{zhihu_growth_text}</div>
             </div>
         </div>
 
@@ -325,16 +432,49 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
         </div>
 
         <div class="footer">
-            <p>© {datetime.now().year} 粉丝数据分析工具 | 由 Python 与 ECharts 强力驱动</p>
+            <p>© {year} 粉丝数据分析工具 | 由 Python 与 ECharts 强力驱动</p>
         </div>
     </div>
 
     <script>
-        // 解析数据
-        const csdnData = {csdn_data_json};
-        const toutiaoData = {toutiao_data_json};
-        const juejinData = {juejin_data_json};
-        const zhihuData = {zhihu_data_json};
+        // 按时间窗口加载的数据块: chunkData[窗口][平台] = 数据点
+        const platforms = ['csdn', 'toutiao', 'juejin', 'zhihu'];
+        // 合并图表还使用各平台对齐合并后的总粉丝数: [时间, 总数, 各平台占比...]
+        const chunkNames = platforms.concat(['{total_chunk}']);
+        const chunkData = {{}};
+        function fansChunkLoaded(platform, win, data) {{
+            (chunkData[win] = chunkData[win] || {{}})[platform] = data;
+        }}
+        
+        // 时间按钮对应的数据块
+        function windowForDays(days) {{
+            if (days === 7) return '7d';
+            if (days === 30) return '30d';
+            return 'all';
+        }}
+        
+        // 只加载当前窗口缺少的数据块，全部加载完成后回调
+        function loadChunk(win, callback) {{
+            const pending = chunkNames.filter(p => !(chunkData[win] && chunkData[win][p]));
+            let remaining = pending.length;
+            if (remaining === 0) {{
+                callback();
+                return;
+            }}
+            pending.forEach(platform => {{
+                const script = document.createElement('script');
+                script.src = '{chunk_dir}/' + platform + '_' + win + '.js?v={chunk_version}';
+                script.onload = script.onerror = function() {{
+                    if (!(chunkData[win] && chunkData[win][platform])) {{
+                        fansChunkLoaded(platform, win, []);
+                    }}
+                    if (--remaining === 0) {{
+                        callback();
+                    }}
+                }};
+                document.head.appendChild(script);
+            }});
+        }}
         
         // 初始化图表
         const csdnChart = echarts.init(document.getElementById('csdn-chart'));
@@ -381,9 +521,8 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
                 {{
                     name: 'CSDN粉丝',
                     type: 'line',
-                    data: csdnData,
+                    encode: {{ x: 0, y: 1 }},
                     showSymbol: false,
-                    smooth: true,
                     lineStyle: {{
                         width: 3,
                         color: '#4e79a7'
@@ -455,9 +594,8 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
                 {{
                     name: '头条粉丝',
                     type: 'line',
-                    data: toutiaoData,
+                    encode: {{ x: 0, y: 1 }},
                     showSymbol: false,
-                    smooth: true,
                     lineStyle: {{
                         width: 3,
                         color: '#f28e2b'
@@ -529,9 +667,8 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
                 {{
                     name: '掘金粉丝',
                     type: 'line',
-                    data: juejinData,
+                    encode: {{ x: 0, y: 1 }},
                     showSymbol: false,
-                    smooth: true,
                     lineStyle: {{
                         width: 3,
                         color: '#59a14f'
@@ -603,9 +740,8 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
                 {{
                     name: '知乎粉丝',
                     type: 'line',
-                    data: zhihuData,
+                    encode: {{ x: 0, y: 1 }},
                     showSymbol: false,
-                    smooth: true,
                     lineStyle: {{
                         width: 3,
                         color: '#8E44AD'
@@ -639,117 +775,167 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
             }}
         }});
         
-        // 设置合并图表选项
-        function updateCombinedChart(days) {{
-            let filteredCsdnData = csdnData;
-            let filteredToutiaoData = toutiaoData;
-            let filteredJuejinData = juejinData;
-            let filteredZhihuData = zhihuData;
-            
-            if (days > 0) {{
-                const cutoffDate = new Date();
-                cutoffDate.setDate(cutoffDate.getDate() - days);
-                
-                filteredCsdnData = csdnData.filter(item => new Date(item[0]) >= cutoffDate);
-                filteredToutiaoData = toutiaoData.filter(item => new Date(item[0]) >= cutoffDate);
-                filteredJuejinData = juejinData.filter(item => new Date(item[0]) >= cutoffDate);
-                filteredZhihuData = zhihuData.filter(item => new Date(item[0]) >= cutoffDate);
-            }}
-            
-            combinedChart.setOption({{
-                title: {{
-                    text: '平台粉丝数对比',
-                    left: 'center',
-                    textStyle: {{
-                        fontSize: 18,
-                        fontWeight: 'bold'
-                    }}
+        // 设置合并图表选项，各平台曲线和总计曲线分别引用共享的数据集
+        const platformNames = ['CSDN', '头条', '掘金', '知乎'];
+        combinedChart.setOption({{
+            title: {{
+                text: '平台粉丝数对比',
+                left: 'center',
+                textStyle: {{
+                    fontSize: 18,
+                    fontWeight: 'bold'
+                }}
+            }},
+            tooltip: {{
+                trigger: 'axis',
+                axisPointer: {{
+                    type: 'shadow'
                 }},
-                tooltip: {{
-                    trigger: 'axis',
-                    axisPointer: {{
-                        type: 'shadow'
+                formatter: function(params) {{
+                    const lines = [params[0].axisValueLabel];
+                    params.forEach(p => {{
+                        lines.push(`${{p.marker}}${{p.seriesName}}: ${{p.value[1]}}`);
+                        if (p.seriesName === '总计') {{
+                            lines.push(platformNames.map((name, i) => `${{name}} ${{(p.value[i + 2] * 100).toFixed(1)}}%`).join(' / '));
+                        }}
+                    }});
+                    return lines.join('<br/>');
+                }}
+            }},
+            legend: {{
+                data: platformNames.concat(['总计']),
+                top: '30px'
+            }},
+            dataset: chunkNames.map(() => ({{ source: [] }})),
+            xAxis: {{
+                type: 'time',
+                splitLine: {{
+                    show: false
+                }}
+            }},
+            yAxis: {{
+                type: 'value',
+                name: '粉丝数',
+                nameLocation: 'end',
+                splitLine: {{
+                    show: true,
+                    lineStyle: {{
+                        type: 'dashed',
+                        color: '#DDD'
+                    }}
+                }}
+            }},
+            series: [
+                {{
+                    name: 'CSDN',
+                    type: 'line',
+                    datasetIndex: 0,
+                    encode: {{ x: 0, y: 1 }},
+                    showSymbol: false,
+                    lineStyle: {{
+                        width: 2.5,
+                        color: '#4e79a7'
                     }}
                 }},
-                legend: {{
-                    data: ['CSDN', '头条', '掘金', '知乎'],
-                    top: '30px'
+                {{
+                    name: '头条',
+                    type: 'line',
+                    datasetIndex: 1,
+                    encode: {{ x: 0, y: 1 }},
+                    showSymbol: false,
+                    lineStyle: {{
+                        width: 2.5,
+                        color: '#f28e2b'
+                    }}
                 }},
-                xAxis: {{
-                    type: 'time',
-                    splitLine: {{
-                        show: false
+                {{
+                    name: '掘金',
+                    type: 'line',
+                    datasetIndex: 2,
+                    encode: {{ x: 0, y: 1 }},
+                    showSymbol: false,
+                    lineStyle: {{
+                        width: 2.5,
+                        color: '#59a14f'
                     }}
                 }},
-                yAxis: {{
-                    type: 'value',
-                    name: '粉丝数',
-                    nameLocation: 'end',
-                    splitLine: {{
-                        show: true,
-                        lineStyle: {{
-                            type: 'dashed',
-                            color: '#DDD'
-                        }}
+                {{
+                    name: '知乎',
+                    type: 'line',
+                    datasetIndex: 3,
+                    encode: {{ x: 0, y: 1 }},
+                    showSymbol: false,
+                    lineStyle: {{
+                        width: 2.5,
+                        color: '#8E44AD'
                     }}
                 }},
-                series: [
-                    {{
-                        name: 'CSDN',
-                        type: 'line',
-                        data: filteredCsdnData,
-                        showSymbol: false,
-                        smooth: true,
-                        lineStyle: {{
-                            width: 2.5,
-                            color: '#4e79a7'
-                        }}
-                    }},
-                    {{
-                        name: '头条',
-                        type: 'line',
-                        data: filteredToutiaoData,
-                        showSymbol: false,
-                        smooth: true,
-                        lineStyle: {{
-                            width: 2.5,
-                            color: '#f28e2b'
-                        }}
-                    }},
-                    {{
-                        name: '掘金',
-                        type: 'line',
-                        data: filteredJuejinData,
-                        showSymbol: false,
-                        smooth: true,
-                        lineStyle: {{
-                            width: 2.5,
-                            color: '#59a14f'
-                        }}
-                    }},
-                    {{
-                        name: '知乎',
-                        type: 'line',
-                        data: filteredZhihuData,
-                        showSymbol: false,
-                        smooth: true,
-                        lineStyle: {{
-                            width: 2.5,
-                            color: '#8E44AD'
-                        }}
+                {{
+                    name: '总计',
+                    type: 'line',
+                    datasetIndex: 4,
+                    encode: {{ x: 0, y: 1 }},
+                    showSymbol: false,
+                    lineStyle: {{
+                        width: 2,
+                        type: 'dashed',
+                        color: '#555'
                     }}
-                ],
-                grid: {{
-                    left: '3%',
-                    right: '4%',
-                    bottom: '3%',
-                    containLabel: true
                 }}
+            ],
+            grid: {{
+                left: '3%',
+                right: '4%',
+                bottom: '3%',
+                containLabel: true
+            }}
+        }});
+        
+        // 数据点超过阈值时启用采样和渐进渲染，并关闭平滑曲线和动画
+        const LARGE_DATA_THRESHOLD = {large_data_threshold};
+        function renderOptions(length) {{
+            const large = length > LARGE_DATA_THRESHOLD;
+            return {{
+                sampling: 'lttb',
+                smooth: !large,
+                animation: !large,
+                progressive: large ? LARGE_DATA_THRESHOLD : 0,
+                progressiveThreshold: LARGE_DATA_THRESHOLD
+            }};
+        }}
+        
+        function updatePlatformChart(chart, data) {{
+            chart.setOption({{
+                dataset: {{ source: data }},
+                series: [renderOptions(data.length)]
             }});
         }}
         
-        // 初始化合并图表 (默认显示7天)
-        updateCombinedChart(7);
+        // 时间范围通过坐标轴裁剪，直接引用共享数据集而不复制或过滤数组
+        function updateCombinedChart(days) {{
+            const data = chunkData[windowForDays(days)];
+            combinedChart.setOption({{
+                dataset: chunkNames.map(p => ({{ source: data[p] }})),
+                xAxis: {{
+                    min: days > 0 ? Date.now() - days * 24 * 3600 * 1000 : null
+                }},
+                series: chunkNames.map(p => renderOptions(data[p].length))
+            }});
+        }}
+        
+        // 用当前窗口的数据块刷新所有图表
+        function showWindow(days) {{
+            const data = chunkData[windowForDays(days)];
+            updatePlatformChart(csdnChart, data.csdn);
+            updatePlatformChart(toutiaoChart, data.toutiao);
+            updatePlatformChart(juejinChart, data.juejin);
+            updatePlatformChart(zhihuChart, data.zhihu);
+            updateCombinedChart(days);
+        }}
+        
+        // 初始化图表 (默认显示7天)
+        let activeDays = 7;
+        loadChunk(windowForDays(activeDays), () => showWindow(activeDays));
         
         // 添加时间过滤器按钮事件
         document.querySelectorAll('.time-btn').forEach(btn => {{
@@ -760,24 +946,149 @@ def generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data):
                 this.classList.add('active');
                 // 更新图表
                 const days = parseInt(this.getAttribute('data-days'));
-                updateCombinedChart(days);
+                activeDays = days;
+                loadChunk(windowForDays(days), function() {{
+                    // 加载期间可能又切换了窗口
+                    if (days === activeDays) {{
+                        showWindow(days);
+                    }}
+                }});
             }});
         }});
         
-        // 处理窗口大小变化
+        // 处理窗口大小变化，拖动窗口时只在停止后重绘一次
+        let resizeTimer = null;
         window.addEventListener('resize', function() {{
-            csdnChart.resize();
-            toutiaoChart.resize();
-            juejinChart.resize();
-            zhihuChart.resize();
-            combinedChart.resize();
+            clearTimeout(resizeTimer);
+            resizeTimer = setTimeout(function() {{
+                csdnChart.resize();
+                toutiaoChart.resize();
+                juejinChart.resize();
+                zhihuChart.resize();
+                combinedChart.resize();
+            }}, {resize_debounce_ms});
         }});
+        
+        // 订阅采集器的事件流，收到新数据点时只追加该点
+        const platformCharts = {{
+            csdn: csdnChart,
+            toutiao: toutiaoChart,
+            juejin: juejinChart,
+            zhihu: zhihuChart
+        }};
+        // 数据点在各窗口中所属的时间段（与 aggregate_pairs 一致）
+        const UTC_OFFSET_MS = {utc_offset_ms};
+        const bucketStart = (ts, size) => Math.floor((ts + UTC_OFFSET_MS) / size) * size - UTC_OFFSET_MS;
+        const windowBuckets = {{
+            '7d': ts => ts,
+            '30d': ts => bucketStart(ts, 3600 * 1000),
+            'all': ts => bucketStart(ts, 24 * 3600 * 1000)
+        }};
+        // 用各平台的最新值更新总计数据，与 merge_series 的对齐方式一致
+        function appendTotal(data, bucket) {{
+            const total = data['{total_chunk}'];
+            const known = platforms.filter(p => data[p] && data[p].length);
+            if (!total || known.length === 0) {{
+                return;
+            }}
+            const values = platforms.map(p => known.includes(p) ? data[p][data[p].length - 1][1] : 0);
+            const sum = values.reduce((a, b) => a + b, 0);
+            const row = [bucket, sum].concat(values.map(v => sum ? Math.round(v / sum * 10000) / 10000 : 0));
+            const last = total[total.length - 1];
+            if (last && last[0] === bucket) {{
+                total[total.length - 1] = row;
+            }} else {{
+                total.push(row);
+            }}
+        }}
+        if (window.EventSource) {{
+            const source = new EventSource('http://127.0.0.1:{stream_port}/events');
+            source.addEventListener('sample', function(event) {{
+                const sample = JSON.parse(event.data);
+                // 页面只显示默认账号的数据
+                if (sample.account && sample.account !== 'default') {{
+                    return;
+                }}
+                const chart = platformCharts[sample.platform];
+                const value = sample.values[sample.field];
+                if (!chart || value === undefined) {{
+                    return;
+                }}
+                // 追加到所有已加载的窗口，聚合窗口只更新最后一个时间段
+                Object.keys(chunkData).forEach(win => {{
+                    const data = chunkData[win][sample.platform];
+                    if (!data) {{
+                        return;
+                    }}
+                    const bucket = windowBuckets[win](sample.timestamp);
+                    const last = data[data.length - 1];
+                    if (last && bucket < last[0]) {{
+                        // 连接时补发的缓存数据点可能早于页面中已有的数据
+                        return;
+                    }}
+                    if (last && last[0] === bucket) {{
+                        last[1] = value;
+                    }} else {{
+                        data.push([bucket, value]);
+                    }}
+                    appendTotal(chunkData[win], bucket);
+                }});
+                const active = chunkData[windowForDays(activeDays)];
+                if (active && active[sample.platform]) {{
+                    updatePlatformChart(chart, active[sample.platform]);
+                    updateCombinedChart(activeDays);
+                }}
+                document.getElementById(sample.platform + '-value').textContent = value;
+            }});
+        }}
     </script>
 </body>
 </html>
     """
+
+# 模板在进程内只解析一次
+_PAGE_TEMPLATE = compile_template(PAGE_TEMPLATE)
+
+# 模板或数据块规则变化时，已生成的页面和数据块全部失效
+REPORT_VERSION = hashlib.sha1(
+    (PAGE_TEMPLATE + json.dumps(CHUNK_WINDOWS, sort_keys=True)).encode('utf-8')).hexdigest()[:12]
+
+def generate_html(summaries, stream_port=event_stream.DEFAULT_PORT, chunk_version="",
+                  chart_runtime_src=ECHARTS_CDN_URL):
+    """生成包含 echarts 图表的 HTML 页面，图表数据从数据块文件按需加载
+
+    summaries 为各平台的数据摘要（见 summarize_pairs），相同输入总是生成相同的页面
+    """
     
-    return html
+    # 如果没有数据，返回错误提示页面
+    if not any(summary["latest"] is not None for summary in summaries.values()):
+        return generate_error_html("没有找到数据，请确保已经收集了足够的数据点。")
+    
+    # 页面显示的更新时间取自数据本身，而不是生成时间
+    utc_offset = get_utc_offset()
+    updated_at = format_timestamp(
+        max(summary["updated_at"] for summary in summaries.values() if summary["updated_at"]) // 1000, utc_offset)
+    
+    fields = {
+        "updated_at": updated_at[:16],
+        "year": updated_at[:4],
+        "chart_runtime_src": chart_runtime_src,
+        "chunk_dir": CHUNK_DIR_NAME,
+        "chunk_version": chunk_version,
+        "large_data_threshold": LARGE_DATA_THRESHOLD,
+        "resize_debounce_ms": RESIZE_DEBOUNCE_MS,
+        "stream_port": stream_port,
+        "utc_offset_ms": utc_offset * 1000,
+        "total_chunk": TOTAL_CHUNK,
+    }
+    for platform in PLATFORMS:
+        summary = summaries[platform]
+        fields[f"{platform}_value"] = summary["latest"] if summary["latest"] is not None else 'N/A'
+        fields[f"{platform}_change_class"] = get_change_class(summary["change"])
+        fields[f"{platform}_change_text"] = format_change(summary["change"])
+        fields[f"{platform}_growth_text"] = format_growth(summary["growth"]) if summary.get("growth") else ''
+    
+    return render_template(_PAGE_TEMPLATE, fields)
 
 def generate_error_html(error_message):
     """生成错误提示页面"""
@@ -890,27 +1201,76 @@ def generate_analysis_page():
     """生成粉丝数据分析页面"""
     try:
         # 获取数据文件路径
-        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+        data_dir = DATA_DIR
         os.makedirs(data_dir, exist_ok=True)
         
-        csdn_file = os.path.join(data_dir, 'csdn_stats.csv')
-        toutiao_file = os.path.join(data_dir, 'toutiao_stats.csv')
-        juejin_file = os.path.join(data_dir, 'juejin_stats.csv')
-        zhihu_file = os.path.join(data_dir, 'zhihu_stats.csv')
+        chunk_dir = os.path.join(data_dir, CHUNK_DIR_NAME)
+        state_file = os.path.join(chunk_dir, 'state.json')
+        output_file = os.path.join(data_dir, 'fans_analysis.html')
         
-        # 读取数据
-        csdn_data = read_csv_data(csdn_file)
-        toutiao_data = read_csv_data(toutiao_file)
-        juejin_data = read_csv_data(juejin_file)
-        zhihu_data = read_csv_data(zhihu_file)
+        stream_port = settings.load_settings().get("event_stream_port", event_stream.DEFAULT_PORT)
+        chart_runtime_src = ensure_chart_runtime(data_dir)
         
-        # 生成HTML
-        html = generate_html(csdn_data, toutiao_data, juejin_data, zhihu_data)
+        # 数据版本：各数据文件的修改时间和大小
+        sources = {
+            platform: data_fingerprint(data_file(platform))
+            for platform in PLATFORMS
+        }
+        page_key = hashlib.sha1(json.dumps(
+            [REPORT_VERSION, stream_port, chart_runtime_src, sources], sort_keys=True).encode('utf-8')).hexdigest()
         
-        # 保存HTML文件
-        output_file = os.path.join(data_dir, 'fans_analysis.html')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
+        state = load_report_state(state_file)
+        if state.get("page_key") == page_key and os.path.exists(output_file):
+            print("数据未变化，使用已生成的分析页面")
+        else:
+            # 只重新生成数据有变化的平台的数据块
+            reusable = state.get("version") == REPORT_VERSION
+            old_sources = state.get("sources", {})
+            summaries = state.get("summaries", {}) if reusable else {}
+            platform_pairs = {}
+            for platform in PLATFORMS:
+                if reusable and platform in summaries and old_sources.get(platform) == sources[platform] \
+                        and chunks_exist(chunk_dir, platform):
+                    continue
+                metric = FOLLOWER_METRICS[platform]
+                history = read_history(platform, [metric])
+                data_pairs = to_data_pairs(history, metric)
+                growth = analyze_history(history, [metric], get_utc_offset())[metric]
+                write_chunks(chunk_dir, platform, build_chunks(data_pairs, get_utc_offset()))
+                summaries[platform] = summarize_pairs(data_pairs, growth)
+                platform_pairs[platform] = data_pairs
+                print(f"已更新 {platform} 的数据块")
+            
+            # 总粉丝数依赖所有平台，任一平台有变化时重新合并
+            if platform_pairs or not chunks_exist(chunk_dir, TOTAL_CHUNK):
+                for platform in PLATFORMS:
+                    if platform not in platform_pairs:
+                        metric = FOLLOWER_METRICS[platform]
+                        platform_pairs[platform] = to_data_pairs(read_history(platform, [metric]), metric)
+                write_chunks(chunk_dir, TOTAL_CHUNK, build_total_chunks(platform_pairs, get_utc_offset()))
+                print("已更新总粉丝数的数据块")
+            
+            # 生成HTML，数据块版本随数据变化，避免浏览器使用旧的数据块
+            chunk_version = hashlib.sha1(json.dumps(sources, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+            html = generate_html(summaries, stream_port, chunk_version, chart_runtime_src)
+            
+            # 保存HTML文件，内容相同时不重写
+            old_html = None
+            if os.path.exists(output_file):
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    old_html = f.read()
+            if html != old_html:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(html)
+            
+            os.makedirs(chunk_dir, exist_ok=True)
+            with open(state_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": REPORT_VERSION,
+                    "page_key": page_key,
+                    "sources": sources,
+                    "summaries": summaries,
+                }, f, ensure_ascii=False, indent=2)
             
         # 在浏览器中打开
         webbrowser.open('file://' + os.path.abspath(output_file))
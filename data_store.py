@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据存储模块 - 各平台 CSV 数据文件的格式定义和读取
+"""
+
+import os
+import csv
+import json
+import time
+import calendar
+import threading
+from operator import itemgetter
+import anomaly
+
+# 数据目录
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# 存储元数据文件，记录数据所用的时区
+META_FILE = "store_meta.json"
+
+# 隔离异常数据的目录
+QUARANTINE_DIR_NAME = "quarantine"
+
+# 默认账号的数据保存在数据目录下（与单账号时的路径相同），其他账号保存在 accounts/<账号>/ 下
+DEFAULT_ACCOUNT = "default"
+ACCOUNTS_DIR_NAME = "accounts"
+
+# 旧数据行使用的本地时间格式
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 各平台数据文件格式: 第一列为时间戳，其余列依次为 metrics 中的指标
+# 指标名与各平台数据字典中的键一致
+PLATFORM_SCHEMAS = {
+    "csdn": {
+        "file": "csdn_stats.csv",
+        "header": ["更新时间", "总访问量", "原创", "粉丝数", "关注数"],
+        "metrics": ["visitors", "originals", "followers", "following"],
+    },
+    "toutiao": {
+        "file": "toutiao_stats.csv",
+        "header": ["更新时间", "获赞数", "粉丝数", "关注数"],
+        "metrics": ["likes", "fans", "follows"],
+    },
+    "juejin": {
+        "file": "juejin_stats.csv",
+        "header": ["更新时间", "文章点赞", "文章阅读", "关注了", "关注者"],
+        "metrics": ["likes", "reads", "following", "followers"],
+    },
+    "zhihu": {
+        "file": "zhihu_stats.csv",
+        "header": ["timestamp", "upvotes", "likes", "collections", "following", "followers"],
+        "metrics": ["upvotes", "likes", "collections", "following", "followers"],
+    },
+}
+
+# 平台列表
+PLATFORMS = list(PLATFORM_SCHEMAS)
+
+# 各平台表示粉丝数的指标
+FOLLOWER_METRICS = {
+    "csdn": "followers",
+    "toutiao": "fans",
+    "juejin": "followers",
+    "zhihu": "followers",
+}
+
+
+_utc_offsets = {}
+_day_epochs = {}
+_write_lock = threading.Lock()
+_detectors = {}
+
+
+def get_utc_offset(data_dir=None):
+    """
+    数据的时区偏移（秒）
+
+    内部时间戳统一为 UTC 纪元秒；旧数据行中的本地时间按这个固定偏移换算。
+    偏移在第一次使用时按本机时区记录到 META_FILE，之后即使本机时区变化也保持一致。
+    """
+    data_dir = data_dir or DATA_DIR
+    if data_dir in _utc_offsets:
+        return _utc_offsets[data_dir]
+
+    meta_file = os.path.join(data_dir, META_FILE)
+    meta = {}
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if "utc_offset" not in meta:
+        meta["utc_offset"] = time.localtime().tm_gmtoff
+        try:
+            os.makedirs(data_dir, exist_ok=True)
+            with open(meta_file, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+        except OSError as e:
+            print(f"保存存储元数据时出错: {e}")
+
+    _utc_offsets[data_dir] = meta["utc_offset"]
+    return meta["utc_offset"]
+
+
+def now_epoch():
+    """当前时间的 UTC 纪元秒"""
+    return int(time.time())
+
+
+def parse_timestamp(text, utc_offset):
+    """
+    解析数据文件中的时间戳，返回 UTC 纪元秒
+
+    新数据行直接保存纪元秒；旧数据行为固定格式 "YYYY-MM-DD HH:MM:SS" 的本地时间，
+    按固定位置切片解析，同一天的日期部分只换算一次，无需 strptime。
+    """
+    if text.isdigit():
+        return int(text)
+    if len(text) != 19:
+        raise ValueError(f"无法解析的时间戳: {text}")
+
+    day = _day_epochs.get(text[:10])
+    if day is None:
+        day = calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]), 0, 0, 0))
+        _day_epochs[text[:10]] = day
+    return day + int(text[11:13]) * 3600 + int(text[14:16]) * 60 + int(text[17:19]) - utc_offset
+
+
+def format_timestamp(epoch, utc_offset=None):
+    """将 UTC 纪元秒格式化为数据时区的本地时间字符串"""
+    if utc_offset is None:
+        utc_offset = get_utc_offset()
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch + utc_offset))
+
+
+def account_dir(account=None, data_dir=None):
+    """账号的数据目录，默认账号为数据目录本身"""
+    data_dir = data_dir or DATA_DIR
+    if not account or account == DEFAULT_ACCOUNT:
+        return data_dir
+    return os.path.join(data_dir, ACCOUNTS_DIR_NAME, account)
+
+
+def data_file(platform, data_dir=None, account=None):
+    """平台（账号）数据文件路径"""
+    return os.path.join(account_dir(account, data_dir), PLATFORM_SCHEMAS[platform]["file"])
+
+
+def read_history(platform, metrics=None, data_dir=None, account=None):
+    """
+    读取平台历史数据，只投影出需要的指标列
+
+    参数:
+        platform: 平台名称，见 PLATFORM_SCHEMAS
+        metrics: 需要的指标列表，为 None 时返回全部指标
+        data_dir: 数据目录，默认为 DATA_DIR
+        account: 账号，默认为 DEFAULT_ACCOUNT
+
+    返回:
+        dict: {"timestamp": [UTC纪元秒], 指标: [整数值], ...}，各列表长度相同；
+        某个指标被隔离（单元格为空）的行只在不需要该指标时返回
+    """
+    schema = PLATFORM_SCHEMAS[platform]
+    metrics = list(metrics) if metrics is not None else list(schema["metrics"])
+    for metric in metrics:
+        if metric not in schema["metrics"]:
+            raise ValueError(f"{platform} 没有指标 {metric}")
+
+    history = {"timestamp": []}
+    columns = [history["timestamp"]]
+    for metric in metrics:
+        history[metric] = []
+        columns.append(history[metric])
+
+    file_path = data_file(platform, data_dir, account)
+    if not os.path.exists(file_path):
+        return history
+
+    # 时间戳在第一列，指标从第二列开始
+    indices = [0] + [schema["metrics"].index(metric) + 1 for metric in metrics]
+    project = itemgetter(*indices)
+    min_length = max(indices) + 1
+    utc_offset = get_utc_offset(data_dir)
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            # 跳过标题行
+            next(reader, None)
+
+            for row in reader:
+                if len(row) < min_length:
+                    continue
+                fields = project(row)
+                if len(indices) == 1:
+                    fields = (fields,)
+                try:
+                    ts = parse_timestamp(fields[0], utc_offset)
+                    values = [int(value) for value in fields[1:]]
+                except ValueError:
+                    # 跳过写入了错误值的行
+                    continue
+                columns[0].append(ts)
+                for column, value in zip(columns[1:], values):
+                    column.append(value)
+    except Exception as e:
+        print(f"读取 {file_path} 时出错: {e}")
+
+    return history
+
+
+def quarantine_file(platform, data_dir=None, account=None):
+    """有指标被判为异常的数据行（原始值和异常指标列表）写入的文件，不参与分析和统计"""
+    return os.path.join(account_dir(account, data_dir), QUARANTINE_DIR_NAME, PLATFORM_SCHEMAS[platform]["file"])
+
+
+def read_recent(platform, rows=anomaly.DEFAULT_WINDOW + 1, metrics=None, data_dir=None, account=None):
+    """
+    从文件末尾读取最近的若干行数据，不扫描整个文件
+
+    返回格式与 read_history 相同
+    """
+    schema = PLATFORM_SCHEMAS[platform]
+    metrics = list(metrics) if metrics is not None else list(schema["metrics"])
+    history = {"timestamp": []}
+    history.update({metric: [] for metric in metrics})
+
+    file_path = data_file(platform, data_dir, account)
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            # 按块向前读取，直到包含足够的行
+            while position > 0 and data.count(b'\n') <= rows:
+                step = min(8192, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+    except OSError:
+        return history
+
+    lines = data.decode('utf-8', errors='ignore').splitlines()
+    if position > 0:
+        # 第一行可能不完整
+        lines = lines[1:]
+    utc_offset = get_utc_offset(data_dir)
+    indices = [schema["metrics"].index(metric) + 1 for metric in metrics]
+    for row in csv.reader(lines[-rows:]):
+        if len(row) < len(schema["header"]):
+            continue
+        try:
+            ts = parse_timestamp(row[0], utc_offset)
+            values = [int(row[index]) for index in indices]
+        except ValueError:
+            # 标题行或错误数据
+            continue
+        history["timestamp"].append(ts)
+        for metric, value in zip(metrics, values):
+            history[metric].append(value)
+    return history
+
+
+def _get_detectors(platform, data_dir, account):
+    """平台（账号）各指标的异常检测器，第一次使用时用文件末尾的数据初始化"""
+    key = (data_dir or DATA_DIR, platform, account or DEFAULT_ACCOUNT)
+    if key not in _detectors:
+        detectors = {}
+        for metric in PLATFORM_SCHEMAS[platform]["metrics"]:
+            # 按指标分别读取，其他指标被隔离的行也用于初始化
+            recent = read_recent(platform, metrics=[metric], data_dir=data_dir, account=account)
+            detector = anomaly.StreamingOutlierDetector()
+            detector.seed(recent[metric])
+            detectors[metric] = detector
+        _detectors[key] = detectors
+    return _detectors[key]
+
+
+def _append_row(file_path, header, row):
+    """追加一行到 CSV 文件，文件不存在时先写入标题行（调用时持有 _write_lock）"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    file_exists = os.path.isfile(file_path)
+    with open(file_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        if not file_exists:
+            writer.writerow(header)
+        writer.writerow(row)
+
+
+def append_sample(platform, values, ts=None, data_dir=None, account=None):
+    """
+    追加一行数据到平台数据文件
+
+    写入前对每个指标分别做异常检测。异常指标在数据文件中留空，不参与分析和统计，
+    同一行的其他指标照常使用；整行原始数据和异常指标列表另外写入隔离文件。
+    所有指标都异常时只写入隔离文件。正常的指标同时写入 latest_values 缓存，供其他进程直接读取。
+
+    参数:
+        platform: 平台名称
+        values: 包含该平台全部指标的字典
+        ts: UTC 纪元秒，默认为当前时间
+        data_dir: 数据目录，默认为 DATA_DIR
+        account: 账号，默认为 DEFAULT_ACCOUNT
+
+    返回:
+        tuple: (写入的数据文件路径（所有指标都异常时为隔离文件路径）, 异常指标列表)
+    """
+    schema = PLATFORM_SCHEMAS[platform]
+    ts = now_epoch() if ts is None else ts
+
+    with _write_lock:
+        detectors = _get_detectors(platform, data_dir, account)
+        numbers = {metric: int(values[metric]) for metric in schema["metrics"]}
+        flagged = [metric for metric in schema["metrics"] if detectors[metric].is_outlier(numbers[metric])]
+        for metric in schema["metrics"]:
+            detectors[metric].record(numbers[metric], metric not in flagged)
+        clean = {metric: value for metric, value in numbers.items() if metric not in flagged}
+
+        file_path = None
+        if flagged:
+            file_path = quarantine_file(platform, data_dir, account)
+            _append_row(file_path, schema["header"] + ["异常指标"],
+                        [ts] + [values[metric] for metric in schema["metrics"]] + [";".join(flagged)])
+            print(f"[{platform}] 数据异常 ({', '.join(flagged)})，已隔离到 {file_path}")
+        if clean:
+            file_path = data_file(platform, data_dir, account)
+            _append_row(file_path, schema["header"],
+                        [ts] + [values[metric] if metric in clean else "" for metric in schema["metrics"]])
+
+    if clean:
+        # 同时更新跨进程共享的最新数据缓存（latest_values 依赖本模块，在这里导入）
+        import latest_values
+        db_file = os.path.join(data_dir, latest_values.DB_FILE_NAME) if data_dir else None
+        try:
+            latest_values.record(platform, clean, account, ts, db_file=db_file)
+        except Exception as e:
+            print(f"[{platform}] 更新最新数据缓存时出错: {e}")
+    return file_path, flagged
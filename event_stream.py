@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+事件流模块 - 通过本地 HTTP 服务以 Server-Sent Events 推送新采集的数据点
+
+同一服务还可以通过 add_route() 注册返回 JSON 的接口，例如采集守护进程的状态查询。
+数据包含账号名称和各项指标，只提供给本机：
+
+    - Host 头必须是 127.0.0.1 或 localhost，防止 DNS 重绑定的网页读取接口
+    - /events 只允许分析页面（file:// 打开，Origin 为 null）跨域读取，其他来源的网页被拒绝
+    - JSON 接口不返回 CORS 头，浏览器中的其他网页无法读取
+    - POST 接口只接受 Content-Type 为 application/json 且没有其他来源 Origin 的请求，
+      网页无法通过跨站的简单请求触发它们
+"""
+
+import json
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from data_store import FOLLOWER_METRICS, DEFAULT_ACCOUNT
+import latest_values
+
+# 默认监听端口
+DEFAULT_PORT = 8765
+# 每个客户端最多缓存的事件数，超出后丢弃最旧的事件
+CLIENT_BUFFER_SIZE = 100
+# 心跳间隔（秒），防止连接被浏览器或代理断开
+KEEPALIVE_INTERVAL = 15
+# 允许的 Host 头主机名
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+class _Client:
+    """单个订阅者，持有有界事件缓冲区"""
+
+    def __init__(self, buffer_size):
+        self.events = deque(maxlen=buffer_size)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+
+class EventBroker:
+    """将事件分发给所有已连接的订阅者"""
+
+    def __init__(self, buffer_size=CLIENT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._next_id = 0
+
+    def subscribe(self):
+        client = _Client(self.buffer_size)
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+        with client.cond:
+            client.closed = True
+            client.cond.notify_all()
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def publish(self, event, data):
+        """向所有订阅者推送一个事件，慢客户端只会丢失自己最旧的事件"""
+        payload = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self._next_id += 1
+            event_id = self._next_id
+            clients = list(self._clients)
+
+        for client in clients:
+            with client.cond:
+                if len(client.events) == client.events.maxlen:
+                    client.dropped += 1
+                client.events.append((event_id, event, payload))
+                client.cond.notify()
+
+
+broker = EventBroker()
+
+_server = None
+_server_lock = threading.Lock()
+
+# 路径 -> (方法, 返回 JSON 数据的函数)
+_routes = {}
+
+
+def add_route(path, handler, method='GET'):
+    """注册一个返回 JSON 的接口，handler 无参数，返回可序列化为 JSON 的数据"""
+    _routes[path] = (method, handler)
+
+
+class _EventStreamHandler(BaseHTTPRequestHandler):
+    """处理 /events 订阅请求和注册的 JSON 接口"""
+
+    def _is_local_origin(self):
+        """请求没有 Origin 头（非浏览器客户端），或者来自本服务自己的地址"""
+        origin = self.headers.get('Origin')
+        if origin is None:
+            return True
+        port = self.server.server_address[1]
+        return origin in (f"http://127.0.0.1:{port}", f"http://localhost:{port}")
+
+    def _is_local_host(self):
+        """Host 头是本机地址（没有 Host 头的 HTTP/1.0 客户端也视为本机）"""
+        host = self.headers.get('Host')
+        if host is None:
+            return True
+        hostname = host.strip().lower()
+        if not hostname.startswith('['):
+            hostname = hostname.rsplit(':', 1)[0]
+        elif ']' in hostname:
+            hostname = hostname[:hostname.index(']') + 1]
+        return hostname in LOCAL_HOSTS
+
+    def _is_report_origin(self):
+        """请求来自分析页面（file:// 页面的 Origin 为 null）或本机的非浏览器客户端"""
+        return self.headers.get('Origin') in (None, 'null') or self._is_local_origin()
+
+    def _send_json(self, method):
+        route = _routes.get(self.path.split('?', 1)[0])
+        if route is None or route[0] != method:
+            self.send_error(404)
+            return
+        if method == 'POST':
+            content_type = self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+            if content_type != 'application/json' or not self._is_local_origin():
+                # 跨站请求伪造：网页只能不经预检发送表单类型的 POST，且会带上自己的 Origin
+                self.send_error(403)
+                return
+            # 读取并丢弃请求体，保持连接状态正确
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            body = json.dumps(route[1](), ensure_ascii=False).encode('utf-8')
+        except Exception as e:
+            print(f"处理 {self.path} 时出错: {e}")
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self._is_local_host():
+            self.send_error(403)
+            return
+        self._send_json('POST')
+
+    def do_GET(self):
+        if not self._is_local_host():
+            # DNS 重绑定：其他域名解析到 127.0.0.1 后，网页会以同源身份读取接口
+            self.send_error(403)
+            return
+        if self.path.split('?', 1)[0] != '/events':
+            self._send_json('GET')
+            return
+        if not self._is_report_origin():
+            # 数据点包含账号名称和各项指标，不提供给其他网页
+            self.send_error(403)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        if self.headers.get('Origin') in (None, 'null'):
+            # 分析页面通过 file:// 打开，Origin 为 null
+            self.send_header('Access-Control-Allow-Origin', 'null')
+        self.end_headers()
+
+        client = broker.subscribe()
+        try:
+            self.wfile.write(b'retry: 3000\n\n')
+            # 先发送最新数据缓存中的数据点，页面生成后其他进程（命令行、守护进程）采集的数据也能显示
+            for payload in bootstrap_samples():
+                self.wfile.write(f"event: sample\ndata: {payload}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            while True:
+                with client.cond:
+                    if not client.events and not client.closed:
+                        client.cond.wait(KEEPALIVE_INTERVAL)
+                    if client.closed:
+                        break
+                    pending = list(client.events)
+                    client.events.clear()
+
+                if not pending:
+                    self.wfile.write(b': keepalive\n\n')
+                for event_id, event, payload in pending:
+                    self.wfile.write(
+                        f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            broker.unsubscribe(client)
+
+    def log_message(self, format, *args):
+        # 不输出每个请求的访问日志
+        pass
+
+
+def start_server(port=DEFAULT_PORT, host='127.0.0.1'):
+    """在后台线程启动事件流服务，重复调用时返回已启动的服务"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            server = ThreadingHTTPServer((host, port), _EventStreamHandler)
+        except OSError as e:
+            print(f"无法启动事件流服务 (端口 {port}): {e}")
+            return None
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        _server = server
+        print(f"事件流服务已启动: http://{host}:{port}/events")
+        return server
+
+
+def stop_server():
+    """停止事件流服务"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+
+def bootstrap_samples():
+    """最新数据缓存中各平台账号粉丝数的数据点，格式与 publish_sample 推送的相同（JSON 字符串）"""
+    try:
+        entries = latest_values.read_all()
+    except Exception as e:
+        print(f"读取最新数据缓存时出错: {e}")
+        return []
+
+    payloads = []
+    for (platform, account), entry in sorted(entries.items()):
+        field = FOLLOWER_METRICS.get(platform, "followers")
+        if field not in entry["values"]:
+            continue
+        updated = entry["metric_updated"][field]
+        # 只带上与粉丝数同时写入的指标
+        values = {metric: value for metric, value in entry["values"].items()
+                  if entry["metric_updated"][metric] == updated}
+        payloads.append(json.dumps({
+            "platform": platform,
+            "account": account,
+            "timestamp": int(updated) * 1000,
+            "field": field,
+            "values": values,
+        }, ensure_ascii=False))
+    return payloads
+
+
+def publish(event, data):
+    """推送一个事件"""
+    broker.publish(event, data)
+
+
+def publish_sample(platform, data, account=DEFAULT_ACCOUNT):
+    """推送一个平台账号的新数据点，只推送完整且不是共享自其他采集的数据，被隔离的指标不推送"""
+    if not data or not data.get("data_complete") or data.get("cached"):
+        return
+
+    if data.get("ts") is None:
+        return
+    # ts 是保存数据行时使用的 UTC 纪元秒，页面使用毫秒时间戳
+    timestamp = data["ts"] * 1000
+
+    quarantined = data.get("quarantined") or []
+    values = {}
+    for key, value in data.items():
+        if key in ("ts", "timestamp", "site", "data_complete", "quarantined", "cached") or key in quarantined:
+            continue
+        try:
+            values[key] = int(value)
+        except (TypeError, ValueError):
+            continue
+    if not values:
+        return
+
+    publish("sample", {
+        "platform": platform,
+        "account": account,
+        "timestamp": timestamp,
+        "field": FOLLOWER_METRICS.get(platform, "followers"),
+        "values": values,
+    })
@@ -1,144 +1,141 @@
 import time
-import os
-import csv
-import datetime
-
-# 导入CSDN数据获取模块
-from csdn import extract_csdn_stats
-# 导入今日头条数据获取模块
-from toutiao import parse_toutiao_user_stats
-# 导入掘金数据获取模块
-from juejin import extract_juejin_stats
-# 导入知乎数据获取模块
-from zhihu import extract_zhihu_stats
-
-def load_config():
-    """从配置文件加载URL"""
-    config = {
-        "CSDN_URL": "https://blog.csdn.net/qq_34598061",  # 默认URL
-        "TOUTIAO_URL": "https://www.toutiao.com/c/user/token/MS4wLjABAAAA-vxeZNtd-323uOaHVG-qQJnP0kL3_QSOTO85-9GJPXo/",  # 默认URL
-        "JUEJIN_URL": "https://juejin.cn/user/3799544245529837/posts",  # 默认URL
-        "ZHIHU_URL": "https://www.zhihu.com/people/bu-yi-jue-63"  # 默认URL
-    }
-    
-    # 尝试读取配置文件
+import argparse
+import functools
+
+import browser_pool
+import collectors
+from collectors import load_config
+from data_store import DEFAULT_ACCOUNT, format_timestamp
+import event_stream
+import latest_values
+import resilience
+import scheduler
+import settings
+
+# 输出采集速度的间隔（秒）
+REPORT_INTERVAL = 60
+
+# 命令行输出的各平台指标名称
+METRIC_LABELS = {
+    "csdn": {"visitors": "总访问量", "originals": "原创", "followers": "粉丝", "following": "关注"},
+    "toutiao": {"likes": "获赞数", "fans": "粉丝数", "follows": "关注数"},
+    "juejin": {"likes": "点赞数", "reads": "阅读量", "followers": "关注者", "following": "关注了"},
+    "zhihu": {"collections": "收藏", "upvotes": "赞同", "likes": "感谢", "following": "关注了", "followers": "关注者"},
+}
+
+def collect_account(platform, account, url, pool=None, deadline=None):
+    """采集一个账号并推送新数据点，浏览器平台在 pool 的工作进程中采集，deadline 为这次采集的截止时间"""
     try:
-        config_file = 'config.env'
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
-            print(f"已从{config_file}加载配置")
-    except Exception as e:
-        print(f"无法加载配置文件: {e}")
-    
-    return config
+        # 每次都重新采集，只共享进行中的采集
+        data = collectors.collect(platform, url, account=account, pool=pool, deadline=deadline, ttl=0)
+    except (resilience.CircuitOpenError, resilience.DeadlineExceeded, resilience.LocalLimitError) as e:
+        # 熔断的账号跳过，不占用采集时间
+        print(e)
+        return
+    print(data)
+    event_stream.publish_sample(platform, data, account)
 
 def monitor_platforms(interval=5, duration=None):
     print(f"开始监控多平台数据")
     print(f"数据采集频率：每 {interval} 秒一次")
     print("按 Ctrl+C 停止...")
 
+    config = load_config()
+    app_settings = settings.load_settings()
+    accounts = collectors.load_accounts(config)
+    print(f"共 {len(accounts)} 个账号")
+
+    # 启动事件流服务，打开的分析页面会实时收到新数据点
+    event_stream.start_server(app_settings.get("event_stream_port", event_stream.DEFAULT_PORT))
+
+    # 所有账号在有界线程池中并发采集，HTTP 和浏览器平台分别限制并发数
+    slots = collectors.slot_limits(app_settings)
+    jobs = scheduler.Scheduler(group_limits=slots)
+    # 浏览器平台在工作进程中采集，复用浏览器，不必每次启动
+    pool = browser_pool.from_settings(app_settings, slots["browser"])
+    for platform, account, url in accounts:
+        info = collectors.COLLECTORS[platform]
+        # 浏览器平台不低于最短间隔，截止时间也不会短于一次浏览器采集需要的时间
+        jobs.add_job(collectors.job_name(platform, account),
+                     functools.partial(collect_account, platform, account, url, pool),
+                     max(interval, info["min_interval"]), priority=info["priority"], group=info["kind"],
+                     budget=collectors.effective_budget(platform, app_settings))
+
     # Initialize start time if duration is specified
-    start_time = time.time() if duration else None
+    start_time = time.time()
+    jobs.start()
 
     try:
         while True:
-            data = extract_csdn_stats(csdn_url)
-            print(data)
-
-            data = parse_toutiao_user_stats(toutiao_url)
-            print(data)
-            
-            data = extract_juejin_stats(juejin_url)
-            print(data)
-            
-            data = extract_zhihu_stats(zhihu_url)
-            print(data)
-
-            # 检查是否超过指定的运行时间
-            if duration and (time.time() - start_time) > duration:
-                print(f"监控完成。已运行 {duration} 秒。")
-                break
-
-            print(f"\n等待 {interval} 秒后继续...")
-            time.sleep(interval)
+            wait = REPORT_INTERVAL
+            if duration:
+                remaining = duration - (time.time() - start_time)
+                # 检查是否超过指定的运行时间
+                if remaining <= 0:
+                    print(f"监控完成。已运行 {duration} 秒。")
+                    break
+                wait = min(wait, remaining)
+            time.sleep(wait)
+            print(f"\n采集速度: {jobs.throughput():.1f} 账号/分钟")
 
     except KeyboardInterrupt:
         print("\n监控被用户停止。")
     except Exception as e:
         print(f"发生错误: {e}")
+    finally:
+        jobs.shutdown()
+        pool.close()
 
 
-if __name__ == "__main__":
-    # 加载配置
+def print_values(platform, account, values, when):
+    """输出一个平台账号的各项指标"""
+    name = collectors.COLLECTORS[platform]["name"]
+    if account != DEFAULT_ACCOUNT:
+        name += f" ({account})"
+    print(f"\n[{name} - {when}]")
+    for metric, label in METRIC_LABELS[platform].items():
+        if metric in values:
+            print(f"{label}: {values[metric]}")
+
+
+def show_latest(force=False, max_age=None):
+    """
+    输出所有账号的最新数据
+
+    缓存中的数据未超过 max_age（默认为平台的采集间隔）时直接使用，不重新采集；
+    force 为 True 时总是重新采集。
+    """
     config = load_config()
-    
-    # CSDN 博客统计
-    csdn_url = config.get("CSDN_URL")
-    csdn_data = extract_csdn_stats(csdn_url)
-    print(f"\n[{csdn_data['site']} - {csdn_data['timestamp']}]")
-    print(f"总访问量: {csdn_data['visitors']}")
-    print(f"原创: {csdn_data['originals']}")
-    print(f"粉丝: {csdn_data['followers']}")
-    print(f"关注: {csdn_data['following']}")
-    
-    # 暂停 3 秒
-    time.sleep(3)
-    
-    # 头条统计
-    toutiao_url = config.get("TOUTIAO_URL")
-    toutiao_data = parse_toutiao_user_stats(toutiao_url)
-    if toutiao_data:
-        print(f"\n[头条 - {toutiao_data['timestamp']}]")
-        print(f"获赞数: {toutiao_data['likes']}")
-        print(f"粉丝数: {toutiao_data['fans']}")
-        print(f"关注数: {toutiao_data['follows']}")
-    else:
-        print("\n头条数据获取失败")
-    
-    # 暂停 3 秒
-    time.sleep(3)
-    
-    # 掘金统计
-    juejin_url = config.get("JUEJIN_URL")
-    juejin_data = extract_juejin_stats(juejin_url)
-    if juejin_data:
-        print(f"\n[掘金 - {juejin_data['timestamp']}]")
-        print(f"点赞数: {juejin_data['likes']}")
-        print(f"阅读量: {juejin_data['reads']}")
-        print(f"关注者: {juejin_data['followers']}")
-        print(f"关注了: {juejin_data['following']}")
-    else:
-        print("\n掘金数据获取失败")
-    
-    # 暂停 3 秒
-    time.sleep(3)
-    
-    # 知乎统计
-    zhihu_url = config.get("ZHIHU_URL")
-    zhihu_data = extract_zhihu_stats(zhihu_url)
-    if zhihu_data and zhihu_data['data_complete']:
-        print(f"\n[知乎 - {zhihu_data['timestamp']}]")
-        print(f"用户名: {zhihu_data['username']}")
-        print(f"简介: {zhihu_data['tagline']}")
-        print(f"回答: {zhihu_data['answers']}")
-        print(f"文章: {zhihu_data['articles']}")
-        print(f"专栏: {zhihu_data['columns']}")
-        print(f"收藏: {zhihu_data['collections']}")
-        print(f"赞同: {zhihu_data['upvotes']}")
-        print(f"感谢: {zhihu_data['thanks']}")
-        print(f"浏览: {zhihu_data['views']}")
-        print(f"关注了: {zhihu_data['following']}")
-        print(f"关注者: {zhihu_data['followers']}")
-        if zhihu_data['recent_activity']:
-            print("最近活动:")
-            for activity in zhihu_data['recent_activity'][:3]:
-                print(f"  - {activity['type']}: {activity['title']}")
-    else:
-        print("\n知乎数据获取失败")
-    
+    app_settings = settings.load_settings()
+    for platform, account, url in collectors.load_accounts(config):
+        name = collectors.job_name(platform, account)
+        if not force:
+            age_limit = max_age if max_age is not None else collectors.effective_interval(platform, app_settings)
+            cached = latest_values.read(platform, account, age_limit)
+            if cached and cached["fresh"]:
+                print_values(platform, account, cached["values"],
+                             f"{format_timestamp(cached['updated'])}，{int(cached['age'])} 秒前的缓存")
+                continue
+
+        deadline = resilience.Deadline(collectors.effective_budget(platform, app_settings))
+        try:
+            data = collectors.collect(platform, url, account=account, deadline=deadline,
+                                      ttl=0 if force else collectors.RESULT_TTL)
+        except (resilience.CircuitOpenError, resilience.DeadlineExceeded, resilience.LocalLimitError) as e:
+            print(f"\n[{name}] {e}")
+            continue
+        if data and data.get("data_complete"):
+            print_values(platform, account, data, data.get("timestamp"))
+        else:
+            print(f"\n[{name}] 数据获取失败")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="输出各平台账号的最新数据，缓存未过期时不重新采集")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新采集所有账号")
+    parser.add_argument("--max-age", type=int, default=None,
+                        help="可接受的缓存数据年龄（秒），默认为各平台的采集间隔")
+    args = parser.parse_args()
+
+    show_latest(force=args.force, max_age=args.max_age)
     print("\n数据统计完成!")
@@ -8,32 +8,46 @@
 
 import requests
 import re
-import datetime
 import os
+import data_store
+import rate_limit
+import resilience
 from bs4 import BeautifulSoup
 import json
 import time
 
-def fetch_page(url, headers=None):
-    """通过requests获取页面内容"""
+def _get(url, headers, deadline):
+    # 每次尝试（包括重试）都占用该域名的请求额度
+    rate_limit.acquire(url, deadline=deadline)
+    response = requests.get(url, headers=headers, timeout=deadline.timeout(10, "请求页面"))
+    response.raise_for_status()
+    return response.text
+
+def fetch_page(url, headers=None, deadline=None):
+    """通过requests获取页面内容，临时错误按退避重试，等待不超过 deadline"""
     if headers is None:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
             'Referer': 'https://juejin.cn/'
         }
 
+    deadline = deadline or resilience.Deadline()
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return resilience.retry(_get, url, headers, deadline,
+                                retry_on=(requests.exceptions.RequestException,), deadline=deadline)
     except requests.exceptions.RequestException as e:
         print(f"获取页面时出错: {e}")
         return None
 
-def extract_juejin_stats(url):
-    """提取掘金用户页面上的统计数据：文章点赞、阅读、关注和被关注数"""
+def extract_juejin_stats(url, account=None, deadline=None):
+    """
+    提取掘金用户页面上的统计数据：文章点赞、阅读、关注和被关注数，数据保存到 account 账号下
+
+    指定 deadline（resilience.Deadline）时所有等待都不会超过截止时间，超出时抛出 resilience.DeadlineExceeded；
+    本机请求额度用完时抛出 rate_limit.RateLimitExceeded
+    """
     try:
-        html_content = fetch_page(url)
+        html_content = fetch_page(url, deadline=deadline)
         if not html_content:
             raise ValueError("没有要解析的HTML内容")
 
@@ -108,50 +122,50 @@ def extract_juejin_stats(url):
         following = re.sub(r'[^\d]', '', following) if following else "0"
         followers = re.sub(r'[^\d]', '', followers) if followers else "0"
         
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ts = data_store.now_epoch()
+        timestamp = data_store.format_timestamp(ts)
         
         # 验证数据是否完整（所有数据非零）
         data_complete = all(
             int(x) > 0 for x in [likes, reads, following, followers]
         )
         
+        quarantined = []
         if data_complete:
-            # 确保data目录存在
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # 构建CSV文件路径
-            csv_file = os.path.join(data_dir, 'juejin_stats.csv')
-            
-            # 检查文件是否存在，决定是否写入标题行
-            file_exists = os.path.isfile(csv_file)
-            
             # 保存数据到CSV文件
-            with open(csv_file, 'a', encoding='utf-8') as f:
-                if not file_exists:
-                    f.write("更新时间,文章点赞,文章阅读,关注了,关注者\n")
-                f.write(
-                    f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{likes},{reads},{following},{followers}\n")
+            csv_file, quarantined = data_store.append_sample("juejin", {
+                "likes": likes,
+                "reads": reads,
+                "following": following,
+                "followers": followers,
+            }, ts, account=account)
 
             print(f"\n数据已保存到 {os.path.abspath(csv_file)}")
         else:
             print("\n掘金数据不完整或有数据项为0，未保存到CSV文件。所有数据项必须大于0才能保存。")
             
         return {
+            "ts": ts,
             "timestamp": timestamp,
             "likes": likes,
             "reads": reads,
             "following": following,
             "followers": followers,
             "site": "掘金",
-            "data_complete": data_complete
+            "data_complete": data_complete,
+            "quarantined": quarantined
         }
+    except (resilience.DeadlineExceeded, resilience.LocalLimitError):
+        # 超时、取消和本机限流不是掘金出错，由调用方处理
+        raise
     except Exception as e:
         print(f"提取掘金数据时出错: {e}")
         import traceback
         traceback.print_exc()
+        ts = data_store.now_epoch()
         return {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": ts,
+            "timestamp": data_store.format_timestamp(ts),
             "likes": "Error",
             "reads": "Error",
             "following": "Error",
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+最新数据缓存 - 每个平台账号每个指标最近一次保存的值，存放在 SQLite 中，本机所有进程共享
+
+data_store.append_sample() 保存数据时同时更新缓存，菜单栏应用、命令行和守护进程
+（包括浏览器工作进程）写入的数据对其他进程立即可见，读取时不需要解析 CSV 或重新采集。
+每条记录带有写入时间和有效期（TTL），超过有效期的记录视为过期。
+"""
+
+import os
+import time
+import sqlite3
+from data_store import DATA_DIR, DEFAULT_ACCOUNT
+
+# 缓存数据库文件名，位于数据目录下
+DB_FILE_NAME = "latest.sqlite3"
+DB_FILE = os.path.join(DATA_DIR, DB_FILE_NAME)
+
+# 默认有效期（秒），与默认的更新频率相同
+DEFAULT_TTL = 30 * 60
+
+_initialized = set()
+
+
+def _connect(db_file):
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=30)
+    if db_file not in _initialized:
+        # WAL 模式下读取不会被其他进程的写入阻塞
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS latest ("
+            "platform TEXT NOT NULL, account TEXT NOT NULL, metric TEXT NOT NULL, "
+            "value INTEGER NOT NULL, updated REAL NOT NULL, ttl REAL NOT NULL, "
+            "PRIMARY KEY (platform, account, metric))")
+        _initialized.add(db_file)
+    return conn
+
+
+def record(platform, values, account=None, ts=None, ttl=DEFAULT_TTL, db_file=None):
+    """
+    记录一个平台账号的最新指标值
+
+    参数:
+        platform: 平台名称
+        values: {指标: 整数值}
+        account: 账号，默认为 DEFAULT_ACCOUNT
+        ts: 数据的 UTC 纪元秒，默认为当前时间
+        ttl: 有效期（秒）
+        db_file: 缓存数据库，默认为 DB_FILE
+    """
+    ts = time.time() if ts is None else ts
+    account = account or DEFAULT_ACCOUNT
+    conn = _connect(db_file or DB_FILE)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO latest (platform, account, metric, value, updated, ttl) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(platform, account, metric, int(value), ts, ttl) for metric, value in values.items()])
+    finally:
+        conn.close()
+
+
+def read(platform, account=None, max_age=None, db_file=None, now=None):
+    """
+    读取一个平台账号缓存的最新指标值
+
+    参数:
+        max_age: 最长可接受的数据年龄（秒），默认使用记录的有效期
+
+    返回:
+        dict: {"values": {指标: 值}, "metric_updated": {指标: 写入时间}, "updated": 最早的写入时间,
+        "age": 秒数, "fresh": 是否未过期}，没有缓存时返回 None
+    """
+    entries = read_all(platform, account, max_age, db_file, now)
+    return entries.get((platform, account or DEFAULT_ACCOUNT))
+
+
+def read_all(platform=None, account=None, max_age=None, db_file=None, now=None):
+    """
+    读取缓存的所有（或指定平台、账号的）最新指标值
+
+    返回:
+        dict: {(平台, 账号): read() 返回的字典}
+    """
+    db_file = db_file or DB_FILE
+    if not os.path.exists(db_file):
+        # 只读取时不创建数据库
+        return {}
+    now = time.time() if now is None else now
+
+    query = "SELECT platform, account, metric, value, updated, ttl FROM latest"
+    conditions, params = [], []
+    if platform is not None:
+        conditions.append("platform = ?")
+        params.append(platform)
+    if account is not None:
+        conditions.append("account = ?")
+        params.append(account)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    conn = _connect(db_file)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    entries = {}
+    for row_platform, row_account, metric, value, updated, ttl in rows:
+        entry = entries.setdefault((row_platform, row_account),
+                                   {"values": {}, "metric_updated": {}, "updated": updated, "ttl": ttl})
+        entry["values"][metric] = value
+        # 被隔离的指标没有更新，各指标的时间可能不同
+        entry["metric_updated"][metric] = updated
+        # 各指标一起写入，取最早的时间作为整组数据的时间
+        entry["updated"] = min(entry["updated"], updated)
+        entry["ttl"] = min(entry["ttl"], ttl)
+
+    for entry in entries.values():
+        entry["age"] = max(0.0, now - entry["updated"])
+        entry["fresh"] = entry["age"] < (entry["ttl"] if max_age is None else max_age)
+    return entries
+
+
+def format_age(seconds):
+    """数据年龄的简短描述，例如 5分钟前"""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return "刚刚"
+    if seconds < 3600:
+        return f"{seconds // 60}分钟前"
+    if seconds < 86400:
+        return f"{seconds // 3600}小时前"
+    return f"{seconds // 86400}天前"
@@ -7,69 +7,57 @@ macOS Menu Bar Application for displaying CSDN and Toutiao statistics
 
 import rumps
 import threading
+import functools
+import multiprocessing
 import time
-import os
-import csv
 from datetime import datetime
-from csdn import extract_csdn_stats
-from toutiao import parse_toutiao_user_stats, init_browser
-from juejin import extract_juejin_stats
-from zhihu import extract_zhihu_stats
-from data_analysis import generate_analysis_page
+import adaptive
+import analytics
+import browser_pool
+import collector_daemon
+import collectors
+import data_store
+import event_stream
+import latest_values
+import resilience
+import scheduler
 import settings
+import ui_updates
 
-def load_config():
-    """从配置文件加载URL"""
-    config = {
-        "CSDN_URL": "https://blog.csdn.net/qq_34598061",  # 默认URL
-        "TOUTIAO_URL": "https://www.toutiao.com/c/user/token/MS4wLjABAAAA-vxeZNtd-323uOaHVG-qQJnP0kL3_QSOTO85-9GJPXo/",  # 默认URL
-        "JUEJIN_URL": "https://juejin.cn/user/3799544245529837/posts",  # 默认URL
-        "ZHIHU_URL": "https://www.zhihu.com/people/bu-yi-jue-63"  # 默认URL
-    }
-    
-    # 尝试读取配置文件
-    try:
-        config_file = 'config.env'
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
-            print(f"已从{config_file}加载配置")
-    except Exception as e:
-        print(f"无法加载配置文件: {e}")
-    
-    return config
+# 从守护进程读取数据的任务名称，本机采集时它检查守护进程是否已经启动
+DAEMON_SYNC_JOB = "daemon"
+# 连续多少次无法连接守护进程后改为本机采集
+DAEMON_MAX_FAILURES = 3
 
 class StatisticsMenuBarApp(rumps.App):
     def __init__(self):
         super(StatisticsMenuBarApp, self).__init__("Stats")
         
-        # 加载配置
-        self.config = load_config()
+        # 加载配置，每个平台可以有多个账号
+        self.config = collectors.load_config()
+        self.accounts = collectors.load_accounts(self.config)
+        print(f"共 {len(self.accounts)} 个账号")
         
         # 加载设置
         self.app_settings = settings.load_settings()
         print(f"加载的应用设置: {self.app_settings}")
         
-        # Initialize data
-        self.csdn_data = None
-        self.toutiao_data = None
-        self.juejin_data = None
-        self.zhihu_data = None
+        # Initialize data: 采集任务名称 -> 最近一次采集的数据
+        self.platform_data = {collectors.job_name(platform, account): None for platform, account, _ in self.accounts}
+        self.platform_data.setdefault("csdn", None)
+        self._settings_lock = threading.Lock()
         self.current_display = "csdn"  # Start with CSDN
         self.rotation_interval = 5  # Seconds to display each platform
         
+        # 菜单只能在主线程中修改：后台线程的修改经过 ui 转到主线程，没有变化的修改被跳过
+        self.ui = ui_updates.UIUpdater()
+        # 有两个以上平台有数据时才启动，在主线程的事件循环中轮换显示
+        self.rotation_timer = rumps.Timer(self.rotate_display, self.rotation_interval)
+        
         # 更新频率（从设置加载）
         self.update_interval = self.app_settings.get("update_interval", 30 * 60)
         print(f"从设置加载的更新频率: {self.update_interval}秒")
         
-        # 定时器和线程控制
-        self.data_thread = None
-        self.should_stop_thread = False
-        
         # 专注模式标志
         self.focus_mode_enabled = self.app_settings.get("focus_mode", False)
         
@@ -79,11 +67,13 @@ class StatisticsMenuBarApp(rumps.App):
         self.csdn_originals_item = rumps.MenuItem("原创: 加载中...")
         self.csdn_followers_item = rumps.MenuItem("粉丝: 加载中...")
         self.csdn_following_item = rumps.MenuItem("关注: 加载中...")
+        self.csdn_growth_item = rumps.MenuItem("增长: 加载中...")
         
         self.toutiao_details_menu = rumps.MenuItem("头条详细数据")
         self.toutiao_likes_item = rumps.MenuItem("获赞: 加载中...")
         self.toutiao_fans_item = rumps.MenuItem("粉丝: 加载中...")
         self.toutiao_follows_item = rumps.MenuItem("关注: 加载中...")
+        self.toutiao_growth_item = rumps.MenuItem("增长: 加载中...")
         
         # 新增掘金菜单项
         self.juejin_details_menu = rumps.MenuItem("掘金详细数据")
@@ -91,6 +81,7 @@ class StatisticsMenuBarApp(rumps.App):
         self.juejin_reads_item = rumps.MenuItem("阅读: 加载中...")
         self.juejin_following_item = rumps.MenuItem("关注了: 加载中...")
         self.juejin_followers_item = rumps.MenuItem("关注者: 加载中...")
+        self.juejin_growth_item = rumps.MenuItem("增长: 加载中...")
         
         # 新增知乎菜单项
         self.zhihu_details_menu = rumps.MenuItem("知乎详细数据")
@@ -99,6 +90,49 @@ class StatisticsMenuBarApp(rumps.App):
         self.zhihu_collections_item = rumps.MenuItem("收藏: 加载中...")
         self.zhihu_following_item = rumps.MenuItem("关注了: 加载中...")
         self.zhihu_followers_item = rumps.MenuItem("关注者: 加载中...")
+        self.zhihu_growth_item = rumps.MenuItem("增长: 加载中...")
+        
+        # 各平台粉丝数的增长统计，在数据线程中从历史数据初始化，之后随新数据增量更新
+        self.growth_trackers = {}
+        self.growth_items = {
+            "csdn": self.csdn_growth_item,
+            "toutiao": self.toutiao_growth_item,
+            "juejin": self.juejin_growth_item,
+            "zhihu": self.zhihu_growth_item,
+        }
+        
+        # 各平台的采集状态（熔断器状态）
+        self.status_items = {
+            platform: rumps.MenuItem("状态: 正常") for platform in collectors.COLLECTORS
+        }
+        
+        # 各平台子菜单中的指标菜单项: 指标 -> (菜单项, 显示名称)
+        self.metric_items = {
+            "csdn": {
+                "visitors": (self.csdn_visitors_item, "访问量"),
+                "originals": (self.csdn_originals_item, "原创"),
+                "followers": (self.csdn_followers_item, "粉丝"),
+                "following": (self.csdn_following_item, "关注"),
+            },
+            "toutiao": {
+                "likes": (self.toutiao_likes_item, "获赞"),
+                "fans": (self.toutiao_fans_item, "粉丝"),
+                "follows": (self.toutiao_follows_item, "关注"),
+            },
+            "juejin": {
+                "likes": (self.juejin_likes_item, "点赞"),
+                "reads": (self.juejin_reads_item, "阅读"),
+                "following": (self.juejin_following_item, "关注了"),
+                "followers": (self.juejin_followers_item, "关注者"),
+            },
+            "zhihu": {
+                "upvotes": (self.zhihu_upvotes_item, "赞同"),
+                "likes": (self.zhihu_likes_item, "喜欢"),
+                "collections": (self.zhihu_collections_item, "收藏"),
+                "following": (self.zhihu_following_item, "关注了"),
+                "followers": (self.zhihu_followers_item, "关注者"),
+            },
+        }
         
         # 专注模式菜单
         self.focus_mode_item = rumps.MenuItem("专注模式", callback=self.toggle_focus_mode)
@@ -162,21 +196,41 @@ class StatisticsMenuBarApp(rumps.App):
         self.update_interval_menu.add(self.update_1h_item)
         self.update_interval_menu.add(self.update_2h_item)
         
+        # 自适应频率：数据不变时自动降低采集频率，上面选择的频率作为比较基准
+        self.adaptive_enabled = self.app_settings.get("adaptive_interval", False)
+        self.adaptive_item = rumps.MenuItem("自适应频率", callback=self.toggle_adaptive_interval)
+        self.adaptive_item.state = self.adaptive_enabled
+        self.adaptive_savings_item = rumps.MenuItem("节省请求: -")
+        self.adaptive_intervals = {}
+        self.update_interval_menu.add(None)  # 分隔符
+        self.update_interval_menu.add(self.adaptive_item)
+        self.update_interval_menu.add(self.adaptive_savings_item)
+        self.throughput_item = rumps.MenuItem("采集速度: -")
+        self.update_interval_menu.add(self.throughput_item)
+        self.browser_item = rumps.MenuItem("浏览器进程: -")
+        self.update_interval_menu.add(self.browser_item)
+        
         # Add items to submenus
         self.csdn_details_menu.add(self.csdn_visitors_item)
         self.csdn_details_menu.add(self.csdn_originals_item)
         self.csdn_details_menu.add(self.csdn_followers_item)
         self.csdn_details_menu.add(self.csdn_following_item)
+        self.csdn_details_menu.add(self.csdn_growth_item)
+        self.csdn_details_menu.add(self.status_items["csdn"])
         
         self.toutiao_details_menu.add(self.toutiao_likes_item)
         self.toutiao_details_menu.add(self.toutiao_fans_item)
         self.toutiao_details_menu.add(self.toutiao_follows_item)
+        self.toutiao_details_menu.add(self.toutiao_growth_item)
+        self.toutiao_details_menu.add(self.status_items["toutiao"])
         
         # 添加掘金子菜单项
         self.juejin_details_menu.add(self.juejin_likes_item)
         self.juejin_details_menu.add(self.juejin_reads_item)
         self.juejin_details_menu.add(self.juejin_following_item)
         self.juejin_details_menu.add(self.juejin_followers_item)
+        self.juejin_details_menu.add(self.juejin_growth_item)
+        self.juejin_details_menu.add(self.status_items["juejin"])
         
         # 添加知乎子菜单项
         self.zhihu_details_menu.add(self.zhihu_upvotes_item)
@@ -184,6 +238,22 @@ class StatisticsMenuBarApp(rumps.App):
         self.zhihu_details_menu.add(self.zhihu_collections_item)
         self.zhihu_details_menu.add(self.zhihu_following_item)
         self.zhihu_details_menu.add(self.zhihu_followers_item)
+        self.zhihu_details_menu.add(self.zhihu_growth_item)
+        self.zhihu_details_menu.add(self.status_items["zhihu"])
+        
+        # 其他账号在平台子菜单中各占一行
+        details_menus = {
+            "csdn": self.csdn_details_menu,
+            "toutiao": self.toutiao_details_menu,
+            "juejin": self.juejin_details_menu,
+            "zhihu": self.zhihu_details_menu,
+        }
+        self.account_items = {}
+        for platform, account, _ in self.accounts:
+            if account != data_store.DEFAULT_ACCOUNT:
+                item = rumps.MenuItem(f"{account}: 加载中...")
+                self.account_items[collectors.job_name(platform, account)] = item
+                details_menus[platform].add(item)
         
         # Configure menu - 完全清除默认菜单并使用我们自己的菜单项
         self.menu.clear()  # 清除默认菜单
@@ -200,29 +270,134 @@ class StatisticsMenuBarApp(rumps.App):
         self.menu.add(self.focus_mode_item)
         # 不添加退出选项，因为rumps已经默认添加了一个
         
-        # 初始化浏览器实例
-        self.browser = None
-        self.init_browser()
-        
-        # Start data collection thread
-        self.start_data_thread()
-        
-        # Start display rotation thread
-        self.display_thread = threading.Thread(target=self.rotate_display)
-        self.display_thread.daemon = True
-        self.display_thread.start()
+        # 先显示最近保存的数据（标记为旧数据），采集到新数据后替换
+        self.load_last_known()
+        
+        # 本机有采集守护进程在运行时只从它读取最新数据，不再自己采集；
+        # 守护进程停止后改为本机采集，本机采集时守护进程启动了就改为从它读取
+        self.event_stream_port = self.app_settings.get("event_stream_port", event_stream.DEFAULT_PORT)
+        self.daemon_mode = False
+        self._mode_lock = threading.Lock()
+        # 守护进程中各账号已显示的数据的采集时间
+        self.daemon_synced = {}
+        # 连续无法连接守护进程的次数
+        self.daemon_failures = 0
+        
+        # 浏览器平台在独立的工作进程中采集，每个浏览器槽位一个工作进程；
+        # 浏览器在第一次采集浏览器平台时才启动，空闲 browser_idle_timeout 秒后关闭
+        self.browser_pool = None
+        
+        # 每个账号一个采集任务，按各自的间隔在有界线程池中执行，HTTP 和浏览器平台分别限制并发数
+        self.scheduler = scheduler.Scheduler(group_limits=collectors.slot_limits(self.app_settings))
+        
+        # 从历史数据初始化增长统计，然后启动唯一的调度线程（新任务立即执行一次）
+        self.scheduler.submit(self.load_growth_trackers)
+        self.set_daemon_mode(collector_daemon.is_running(self.event_stream_port))
+        self.scheduler.add_job(DAEMON_SYNC_JOB, self.sync_from_daemon,
+                               self.app_settings.get("daemon_poll_interval", 30))
+        self.scheduler.start()
     
-    def init_browser(self):
-        """初始化浏览器实例"""
-        try:
-            self.browser = init_browser()
-            if self.browser:
-                print("浏览器初始化成功")
+    def set_daemon_mode(self, enabled):
+        """在从守护进程读取数据和本机采集之间切换，可以在任何线程中调用"""
+        with self._mode_lock:
+            if enabled:
+                print(f"检测到采集守护进程: {collector_daemon.daemon_url(self.event_stream_port)}")
+                for platform, account, _ in self.accounts:
+                    self.scheduler.remove_job(collectors.job_name(platform, account))
+                # 守护进程提供事件流，进行中的浏览器采集会失败并在下次同步时被守护进程的数据替换
+                event_stream.stop_server()
+                if self.browser_pool is not None:
+                    self.browser_pool.close()
+                    self.browser_pool = None
+                self.daemon_failures = 0
             else:
-                print("浏览器初始化失败")
-        except Exception as e:
-            print(f"初始化浏览器时出错: {e}")
-            self.browser = None
+                if self.browser_pool is None:
+                    self.browser_pool = browser_pool.from_settings(
+                        self.app_settings, collectors.slot_limits(self.app_settings)["browser"])
+                # 启动事件流服务，分析页面通过它实时接收新数据点
+                event_stream.start_server(self.event_stream_port)
+                self.schedule_collectors()
+                self.daemon_synced = {}
+            self.daemon_mode = enabled
+            # 按当前模式设置各平台的采集间隔
+            self.apply_intervals()
+    
+    def schedule_collectors(self):
+        """为每个账号添加采集任务，HTTP 和浏览器平台分属两个分组，各自限制并发数，每次采集有时间预算"""
+        for platform, account, url in self.accounts:
+            info = collectors.COLLECTORS[platform]
+            self.scheduler.add_job(
+                collectors.job_name(platform, account),
+                functools.partial(self.collect_platform, platform, account, url),
+                collectors.effective_interval(platform, self.app_settings),
+                priority=info["priority"],
+                group=info["kind"],
+                budget=collectors.effective_budget(platform, self.app_settings),
+            )
+    
+    def apply_intervals(self):
+        """更新频率或自适应模式变化后重新计算各账号的采集间隔"""
+        self.adaptive_intervals = {}
+        if self.daemon_mode:
+            # 采集间隔由守护进程按它启动时读取的设置决定
+            self.update_adaptive_savings()
+            return
+        for platform, account, _ in self.accounts:
+            info = collectors.COLLECTORS[platform]
+            name = collectors.job_name(platform, account)
+            interval = collectors.effective_interval(platform, self.app_settings)
+            if self.adaptive_enabled:
+                # 从当前的固定间隔开始，数据不变时逐步退避，变化时收紧
+                min_interval = max(self.app_settings.get("adaptive_min_interval", 60), info["min_interval"])
+                tracker = adaptive.AdaptiveInterval(
+                    min_interval,
+                    self.app_settings.get("adaptive_max_interval", 4 * 60 * 60),
+                    interval,
+                    collectors.adaptive_metrics(platform, self.app_settings),
+                )
+                self.adaptive_intervals[name] = tracker
+                interval = tracker.interval()
+            self.scheduler.set_interval(name, interval)
+            print(f"{name} 采集间隔: {interval}秒")
+        self.update_adaptive_savings()
+    
+    def adapt_interval(self, name, data):
+        """按新采集的数据调整采集任务的间隔"""
+        tracker = self.adaptive_intervals.get(name)
+        if tracker is None:
+            return
+        values = {}
+        for metric in tracker.last_values:
+            try:
+                values[metric] = int(data[metric])
+            except (KeyError, TypeError, ValueError):
+                continue
+        interval = tracker.observe(values)
+        self.scheduler.set_interval(name, interval)
+        print(f"[{name}] 自适应采集间隔: {interval:.0f}秒")
+        self.update_adaptive_savings()
+    
+    def update_adaptive_savings(self):
+        """显示自适应模式与固定频率相比节省的请求"""
+        if not self.adaptive_enabled:
+            self.ui.set_title(self.adaptive_savings_item, "节省请求: -")
+            return
+        polls = fixed_polls = 0
+        for tracker in self.adaptive_intervals.values():
+            savings = tracker.savings()
+            polls += savings["polls"]
+            fixed_polls += savings["fixed_polls"]
+        # 数据频繁变化时请求可能比固定频率多，节省比例为负数
+        saved = 1 - polls / fixed_polls if fixed_polls else 0.0
+        self.ui.set_title(self.adaptive_savings_item, f"节省请求: {saved:.0%} ({polls}/{fixed_polls}次)")
+    
+    def toggle_adaptive_interval(self, sender):
+        """切换自适应频率"""
+        sender.state = not sender.state
+        self.adaptive_enabled = bool(sender.state)
+        self.app_settings["adaptive_interval"] = self.adaptive_enabled
+        settings.update_setting("adaptive_interval", self.adaptive_enabled)
+        self.apply_intervals()
     
     def toggle_focus_mode(self, sender):
         """切换专注模式"""
@@ -231,6 +406,8 @@ class StatisticsMenuBarApp(rumps.App):
         
         # 保存设置
         settings.update_setting("focus_mode", self.focus_mode_enabled)
+        # 专注模式下停止轮换，关闭后立即显示最新数据
+        self.render_title()
         
         if sender.state:
             try:
@@ -300,8 +477,8 @@ class StatisticsMenuBarApp(rumps.App):
         saved_settings = settings.load_settings()
         print(f"检查保存后的设置: update_interval={saved_settings.get('update_interval')}, update_interval_name={saved_settings.get('update_interval_name')}")
         
-        # 重启数据收集线程
-        self.restart_data_thread()
+        # 更新各平台采集任务的间隔
+        self.apply_intervals()
         
         # 显示通知
         try:
@@ -316,37 +493,6 @@ class StatisticsMenuBarApp(rumps.App):
         # 输出日志，用于调试
         print(f"更新频率已修改为: {interval_text}，间隔秒数: {self.update_interval}")
     
-    def restart_data_thread(self):
-        """重启数据收集线程"""
-        # 停止现有线程
-        print(f"准备重启数据收集线程，当前更新频率: {self.update_interval}秒")
-        self.should_stop_thread = True
-        
-        # 等待线程结束或超时
-        if self.data_thread and self.data_thread.is_alive():
-            try:
-                print("等待现有线程结束...")
-                self.data_thread.join(1)  # 等待1秒
-                if self.data_thread.is_alive():
-                    print("线程仍在运行，继续执行...")
-            except Exception as e:
-                print(f"等待线程结束时出错: {e}")
-        
-        # 启动新线程
-        print("现有线程已停止，准备启动新线程")
-        self.should_stop_thread = False
-        self.data_thread = None  # 确保引用被清除
-        self.start_data_thread()
-        
-        # 输出日志，用于调试
-        print(f"数据收集线程已重启，更新间隔: {self.update_interval}秒")
-    
-    def start_data_thread(self):
-        """启动数据收集线程"""
-        self.data_thread = threading.Thread(target=self.collect_data_periodically)
-        self.data_thread.daemon = True
-        self.data_thread.start()
-    
     def show_data_analysis(self, _):
         """显示数据分析页面"""
         try:
@@ -368,6 +514,8 @@ class StatisticsMenuBarApp(rumps.App):
     def _generate_analysis(self):
         """在后台线程生成并显示分析页面"""
         try:
+            # 分析页面模块（包含页面模板）较大，第一次打开分析页面时才导入
+            from data_analysis import generate_analysis_page
             output_file = generate_analysis_page()
             print(f"数据分析页面已生成: {output_file}")
         except Exception as e:
@@ -375,119 +523,239 @@ class StatisticsMenuBarApp(rumps.App):
             import traceback
             print(traceback.format_exc())
     
-    def rotate_display(self):
-        """轮换显示不同平台的粉丝数"""
-        while True:
-            if not self.focus_mode_enabled:
-                # 只显示CSDN的粉丝数
-                self.current_display = "csdn"
-                self.update_menu_items()
-            time.sleep(self.rotation_interval)
+    def load_growth_trackers(self):
+        """从历史数据初始化各平台的增长统计（每个平台只读取一遍粉丝列）"""
+        for platform in data_store.PLATFORMS:
+            try:
+                tracker = analytics.follower_growth(platform)
+                self.growth_trackers[platform] = tracker
+                self.update_growth_item(platform)
+            except Exception as e:
+                print(f"加载{platform}增长统计时出错: {e}")
     
-    def update_menu_items(self):
-        """根据当前数据更新菜单项显示"""
-        if not self.focus_mode_enabled:
-            if self.csdn_data:
-                self.title = f"CSDN粉丝: {self.csdn_data['followers']}"
+    def record_growth(self, platform, data):
+        """将新采集的粉丝数加入增长统计"""
+        tracker = self.growth_trackers.get(platform)
+        if tracker is None or data.get("quarantined") or data.get("cached"):
+            # 被隔离的异常数据不参与统计；共享自其他采集的数据已经统计过
+            return
+        try:
+            tracker.add(data["ts"], int(data[data_store.FOLLOWER_METRICS[platform]]))
+            self.update_growth_item(platform)
+        except (KeyError, ValueError) as e:
+            print(f"更新{platform}增长统计时出错: {e}")
+    
+    def update_growth_item(self, platform):
+        """更新平台子菜单中的增长统计"""
+        tracker = self.growth_trackers.get(platform)
+        if tracker is not None and tracker.count:
+            self.ui.set_title(self.growth_items[platform], f"增长: {analytics.format_growth(tracker.summary())}")
+    
+    def load_last_known(self):
+        """从最新数据缓存读取各账号最近保存的数据并显示，标记数据的年龄，不访问网络"""
+        cached = latest_values.read_all()
+        now = time.time()
+        for platform, account, _ in self.accounts:
+            entry = cached.get((platform, account))
+            if entry is not None:
+                values, age = entry["values"], entry["age"]
             else:
-                self.title = "获取中..."
+                # 缓存建立之前保存的数据，从数据文件末尾读取最后一行
+                recent = data_store.read_recent(platform, rows=1, account=account)
+                if not recent["timestamp"]:
+                    continue
+                values = {metric: recent[metric][-1] for metric in data_store.PLATFORM_SCHEMAS[platform]["metrics"]}
+                age = now - recent["timestamp"][-1]
+            
+            name = collectors.job_name(platform, account)
+            stale = latest_values.format_age(age)
+            # stale 表示这是启动时读取的旧数据，新采集的数据不带这个键
+            self.platform_data[name] = dict(values, data_complete=True, stale=stale)
+            if account == data_store.DEFAULT_ACCOUNT:
+                for metric, (item, label) in self.metric_items[platform].items():
+                    self.ui.set_title(item, f"{label}: {values.get(metric, '-')}")
+            self.show_status(platform, account, f"{stale}的数据，更新中...")
+        self.update_menu_items()
     
-    def collect_data(self):
-        """收集所有平台的数据"""
-        # 获取CSDN数据
+    def rotation_platforms(self):
+        """有数据（默认账号）可以显示在标题中的平台"""
+        return [platform for platform in data_store.PLATFORMS if self.platform_data.get(platform)]
+    
+    def platform_title(self, platform):
+        """标题中显示的平台粉丝数，启动时读取的旧数据标出年龄"""
+        data = self.platform_data[platform]
+        title = f"{collectors.COLLECTORS[platform]['name']}粉丝: {data.get(data_store.FOLLOWER_METRICS[platform], '-')}"
+        if data.get("stale"):
+            title += f" ({data['stale']})"
+        return title
+    
+    def rotate_display(self, _=None):
+        """轮换显示不同平台的粉丝数，由 rotation_timer 在主线程中调用"""
+        platforms = self.rotation_platforms()
+        if self.focus_mode_enabled or not platforms:
+            return
+        if self.current_display in platforms:
+            self.current_display = platforms[(platforms.index(self.current_display) + 1) % len(platforms)]
+        else:
+            self.current_display = platforms[0]
+        self.ui.set_title(self, self.platform_title(self.current_display))
+    
+    def update_menu_items(self):
+        """数据变化后更新标题，可以在任何线程中调用"""
+        self.ui.call(self.render_title)
+    
+    def render_title(self):
+        """在主线程中显示当前平台的粉丝数，并按有数据的平台数启动或停止轮换"""
+        platforms = self.rotation_platforms()
+        rotate = len(platforms) > 1 and not self.focus_mode_enabled
+        if rotate and not self.rotation_timer.is_alive():
+            self.rotation_timer.start()
+        elif not rotate and self.rotation_timer.is_alive():
+            self.rotation_timer.stop()
+        
+        if self.focus_mode_enabled:
+            # 专注模式下标题暂停更新
+            return
+        if not platforms:
+            self.ui.set_title(self, "获取中...")
+            return
+        if self.current_display not in platforms:
+            self.current_display = platforms[0]
+        self.ui.set_title(self, self.platform_title(self.current_display))
+    
+    def show_data(self, platform, account, data):
+        """保存账号新采集的完整数据，默认账号同时更新平台子菜单和增长统计"""
+        if account == data_store.DEFAULT_ACCOUNT:
+            for metric, (item, label) in self.metric_items[platform].items():
+                self.ui.set_title(item, f"{label}: {data.get(metric, '-')}")
+            self.record_growth(platform, data)
+        self.platform_data[collectors.job_name(platform, account)] = data
+    
+    def show_status(self, platform, account, status):
+        """更新账号的采集状态，其他账号的一行同时显示粉丝数"""
+        name = collectors.job_name(platform, account)
+        if account == data_store.DEFAULT_ACCOUNT:
+            self.ui.set_title(self.status_items[platform], f"状态: {status}")
+        elif name in self.account_items:
+            data = self.platform_data.get(name) or {}
+            follower_metric = data_store.FOLLOWER_METRICS[platform]
+            self.ui.set_title(self.account_items[name], f"{account}: 粉丝 {data.get(follower_metric, '-')} ({status})")
+    
+    def sync_from_daemon(self):
+        """
+        从采集守护进程读取各账号的最新数据和状态，由调度器定期调用
+
+        本机采集时检查守护进程是否已经启动；连续 DAEMON_MAX_FAILURES 次无法连接守护进程时改为本机采集
+        """
+        if not self.daemon_mode:
+            if not collector_daemon.is_running(self.event_stream_port):
+                return
+            self.set_daemon_mode(True)
         try:
-            print("\n正在获取CSDN数据...")
-            self.csdn_data = extract_csdn_stats(self.config["CSDN_URL"])
-            if self.csdn_data and self.csdn_data["data_complete"]:
-                print(f"[CSDN] 粉丝数: {self.csdn_data['followers']} (数据完整)")
-                
-                # 更新CSDN菜单项
-                self.csdn_visitors_item.title = f"访问量: {self.csdn_data['visitors']}"
-                self.csdn_originals_item.title = f"原创: {self.csdn_data['originals']}"
-                self.csdn_followers_item.title = f"粉丝: {self.csdn_data['followers']}"
-                self.csdn_following_item.title = f"关注: {self.csdn_data['following']}"
+            latest = collector_daemon.request_json("/latest", self.event_stream_port)
+            status = collector_daemon.request_json("/status", self.event_stream_port)
+        except (OSError, ValueError) as e:
+            self.daemon_failures += 1
+            print(f"无法连接采集守护进程 ({self.daemon_failures}/{DAEMON_MAX_FAILURES}): {e}")
+            if self.daemon_failures >= DAEMON_MAX_FAILURES:
+                print("采集守护进程已停止，改为本机采集")
+                self.set_daemon_mode(False)
+                return
+            for platform, account, _ in self.accounts:
+                self.show_status(platform, account, "守护进程未连接")
+            return
+        self.daemon_failures = 0
+        
+        for name, entry in latest.items():
+            if entry["platform"] not in self.metric_items or self.daemon_synced.get(name) == entry["collected_at"]:
+                continue
+            self.daemon_synced[name] = entry["collected_at"]
+            self.show_data(entry["platform"], entry["account"], entry["data"])
+        
+        breakers = status.get("breakers", {})
+        for platform, account, _ in self.accounts:
+            snapshot = breakers.get(collectors.job_name(platform, account))
+            text = resilience.describe_snapshot(snapshot) if snapshot else resilience.STATE_NAMES[resilience.CLOSED]
+            self.show_status(platform, account, text)
+        self.ui.set_title(self.throughput_item, f"采集速度: {status.get('throughput', 0):.1f} 账号/分钟 (守护进程)")
+        if status.get("browser_workers"):
+            self.ui.set_title(self.browser_item, f"浏览器进程: {browser_pool.describe_stats(status['browser_workers'])}")
+        self.update_menu_items()
+    
+    def refresh_daemon(self):
+        """请求守护进程立即采集，新数据在下次同步时显示"""
+        try:
+            collector_daemon.request_json("/refresh", self.event_stream_port, method="POST")
+        except (OSError, ValueError) as e:
+            print(f"无法连接采集守护进程: {e}")
+    
+    def collect_platform(self, platform, account=data_store.DEFAULT_ACCOUNT, url=None, deadline=None):
+        """采集一个平台账号的数据并更新对应的菜单项，由调度器在工作线程中调用，deadline 为这次采集的截止时间"""
+        info = collectors.COLLECTORS[platform]
+        name = collectors.job_name(platform, account)
+        follower_metric = data_store.FOLLOWER_METRICS[platform]
+        data = None
+        try:
+            print(f"\n正在获取{info['name']}数据 ({account})...")
+            # 浏览器平台在进程池中采集；每次都重新采集，只共享进行中的采集
+            data = collectors.collect(platform, url or self.config[info["config_key"]], account=account,
+                                      pool=self.browser_pool, deadline=deadline, ttl=0)
+            if data and data["data_complete"]:
+                print(f"[{name}] 粉丝数: {data[follower_metric]} (数据完整)")
+                # 推送新数据点到分析页面（共享自其他采集的数据点不会重复推送，被隔离的指标不推送）
+                event_stream.publish_sample(platform, data, account)
+                if data.get("quarantined"):
+                    # 疑似采集错误的数据不显示，也不影响采集间隔，保留上次的数据
+                    print(f"[{name}] 数据异常 ({', '.join(data['quarantined'])})，不更新显示")
+                else:
+                    self.show_data(platform, account, data)
+                    if not data.get("cached"):
+                        self.adapt_interval(name, data)
             else:
-                print("[CSDN] 数据不完整或获取失败")
-                if not self.csdn_data:
-                    self.csdn_data = {
-                        "followers": "Error",
+                print(f"[{name}] 数据不完整或获取失败")
+                if not data:
+                    data = {
+                        follower_metric: "Error",
                         "data_complete": False
                     }
+                self.platform_data[name] = data
+        except (resilience.CircuitOpenError, resilience.LocalLimitError) as e:
+            # 熔断期间或本机请求额度用完时跳过，保留上次的数据
+            print(f"[{name}] {e}")
         except Exception as e:
-            print(f"获取CSDN数据时出错: {e}")
-            self.csdn_data = {
-                "followers": "Error",
+            print(f"获取{name}数据时出错: {e}")
+            self.platform_data[name] = {
+                follower_metric: "Error",
                 "data_complete": False
             }
         
-        # 更新最后更新时间
-        settings.update_setting("last_update", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        # 更新最后更新时间（多个采集任务可能同时完成）
+        with self._settings_lock:
+            settings.update_setting("last_update", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
         # 更新显示
+        status = resilience.breaker(name).describe()
+        if deadline is not None and deadline.exceeded_where:
+            status += f"，超时于{deadline.exceeded_where}"
+        if data and data.get("quarantined"):
+            status += f"，数据异常: {', '.join(data['quarantined'])}"
+        self.show_status(platform, account, status)
+        self.ui.set_title(self.throughput_item, f"采集速度: {self.scheduler.throughput():.1f} 账号/分钟")
+        if info["kind"] == "browser" and self.browser_pool is not None:
+            self.ui.set_title(self.browser_item, f"浏览器进程: {self.browser_pool.describe()}")
         self.update_menu_items()
     
-    def collect_data_periodically(self):
-        """Collect data periodically"""
-        try:
-            # 获取线程ID用于调试
-            import threading
-            thread_id = threading.get_ident()
-            
-            # 记录当前的更新间隔，用于检测是否发生变化
-            current_interval = self.update_interval
-            print(f"线程 {thread_id}: 启动数据收集线程，更新间隔: {current_interval}秒")
-            
-            # 先执行一次数据收集
-            self.collect_data()
-            
-            # 记录上次收集数据的时间
-            last_collection_time = time.time()
-            
-            # 然后定期执行
-            while not self.should_stop_thread:
-                # 每秒检查一次是否需要更新数据或者更新间隔是否变化
-                time.sleep(1)
-                
-                if self.should_stop_thread:
-                    print(f"线程 {thread_id}: 收到停止信号，退出循环")
-                    break
-                
-                # 检查是否需要收集数据
-                current_time = time.time()
-                elapsed_time = current_time - last_collection_time
-                
-                # 如果更新间隔发生变化，重新计算下次更新时间
-                if current_interval != self.update_interval:
-                    print(f"线程 {thread_id}: 检测到更新间隔变化: {current_interval} -> {self.update_interval}秒")
-                    # 如果新的间隔比已经等待的时间短，立即执行收集
-                    if self.update_interval <= elapsed_time:
-                        print(f"线程 {thread_id}: 新间隔小于已等待时间，立即执行数据收集")
-                        self.collect_data()
-                        last_collection_time = time.time()
-                    current_interval = self.update_interval
-                    print(f"线程 {thread_id}: 更新间隔已更新为: {current_interval}秒")
-                
-                # 如果已经等待了足够的时间，执行数据收集
-                elif elapsed_time >= current_interval:
-                    print(f"线程 {thread_id}: 已达到更新时间，执行数据收集 (经过: {elapsed_time:.1f}秒, 间隔: {current_interval}秒)")
-                    self.collect_data()
-                    last_collection_time = time.time()
-                
-                # 输出调试信息
-                if int(elapsed_time) % 5 == 0:  # 每5秒输出一次状态
-                    print(f"线程 {thread_id}: 等待更新, 已经等待: {elapsed_time:.1f}秒, 间隔设置: {current_interval}秒, 剩余: {max(0, current_interval-elapsed_time):.1f}秒")
-                    
-        except Exception as e:
-            print(f"周期性数据收集出错: {e}")
-            import traceback
-            print(traceback.format_exc())
+    def collect_data(self):
+        """立即收集所有平台的数据，调度线程会被唤醒并提交所有任务"""
+        if self.daemon_mode:
+            self.scheduler.submit(self.refresh_daemon)
+        else:
+            self.scheduler.trigger()
     
     @rumps.clicked("更新数据")
     def update_data(self, _):
         """Manually update data"""
-        thread = threading.Thread(target=self.collect_data)
-        thread.daemon = True
-        thread.start()
+        self.collect_data()
         try:
             rumps.notification("数据更新", "统计数据", "正在更新数据，请稍等...")
         except Exception as e:
@@ -498,16 +766,18 @@ class StatisticsMenuBarApp(rumps.App):
         try:
             super(StatisticsMenuBarApp, self).run()
         finally:
-            # 标记线程应该停止
-            self.should_stop_thread = True
+            # 停止调度，不再提交新的采集任务
+            self.scheduler.shutdown()
+            
+            # 关闭事件流服务
+            event_stream.stop_server()
             
-            # 应用退出时关闭浏览器
-            if self.browser:
-                try:
-                    print("应用退出，关闭浏览器...")
-                    self.browser.quit()
-                except Exception as e:
-                    print(f"关闭浏览器时出错: {e}")
+            # 应用退出时关闭浏览器工作进程
+            if self.browser_pool is not None:
+                print("应用退出，关闭浏览器...")
+                self.browser_pool.close()
 
 if __name__ == "__main__":
+    # 打包后的应用启动浏览器工作进程时需要
+    multiprocessing.freeze_support()
     StatisticsMenuBarApp().run()
\ No newline at end of file
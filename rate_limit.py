@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+限流模块 - 按域名的令牌桶限流，状态保存在 SQLite 中，同一台机器上的所有进程和线程共享
+
+菜单栏应用、命令行监控和手动更新同时运行时，对同一网站的请求总数仍然不会超过设定的速率。
+
+默认限额按 config.env 中该域名的账号数放大：每个账号每分钟 DEFAULT_RATE_PER_MINUTE 次，
+突发额度至少能让所有账号各请求一次，监控多个账号时一轮采集不会因限流超时。
+在设置 rate_limits 中指定的限额是整个域名的总额度，不会放大。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+import collectors
+import resilience
+import settings
+from data_store import DATA_DIR
+
+# 限流状态数据库
+DB_FILE = os.path.join(DATA_DIR, "rate_limit.sqlite3")
+
+# 默认限额（每个账号）：每分钟请求数和允许的突发请求数；可在设置 rate_limits 中按域名覆盖
+DEFAULT_RATE_PER_MINUTE = 6
+DEFAULT_BURST = 3
+# 等待令牌的最长时间（秒）
+DEFAULT_MAX_WAIT = 60
+
+
+class RateLimitExceeded(resilience.LocalLimitError):
+    """在最长等待时间内没有得到令牌"""
+
+
+_limits = None
+# 域名 -> 配置的账号数
+_account_counts = None
+# 已经提示过限额不足的域名
+_warned = set()
+_limits_lock = threading.Lock()
+_initialized = set()
+
+
+def domain_of(url):
+    """URL 的域名，作为限流的键"""
+    return (urlsplit(url).hostname or url).lower()
+
+
+def count_accounts(accounts):
+    """按域名统计账号数，accounts 为 collectors.load_accounts() 的结果"""
+    counts = {}
+    for _, _, url in accounts:
+        domain = domain_of(url)
+        counts[domain] = counts.get(domain, 0) + 1
+    return counts
+
+
+def get_limit(domain):
+    """域名的 (每秒令牌数, 桶容量)，设置和账号配置只在第一次使用时读取"""
+    global _limits, _account_counts
+    with _limits_lock:
+        if _limits is None:
+            _limits = {}
+            for key, limit in settings.load_settings().get("rate_limits", {}).items():
+                limit = dict(limit)
+                rate_per_minute = limit.get("rate_per_minute", DEFAULT_RATE_PER_MINUTE)
+                if not isinstance(rate_per_minute, (int, float)) or rate_per_minute <= 0:
+                    print(f"[{key}] rate_per_minute 必须大于 0，使用默认值 {DEFAULT_RATE_PER_MINUTE}")
+                    limit["rate_per_minute"] = DEFAULT_RATE_PER_MINUTE
+                _limits[key] = limit
+            _account_counts = count_accounts(collectors.load_accounts(collectors.load_config()))
+    accounts = max(1, _account_counts.get(domain, 1))
+
+    limit = _limits.get(domain) or _limits.get("default")
+    if not limit:
+        return DEFAULT_RATE_PER_MINUTE * accounts / 60.0, max(DEFAULT_BURST, accounts)
+
+    rate_per_minute = limit.get("rate_per_minute", DEFAULT_RATE_PER_MINUTE)
+    burst = max(1, limit.get("burst", DEFAULT_BURST))
+    if burst + rate_per_minute * DEFAULT_MAX_WAIT / 60.0 < accounts and domain not in _warned:
+        # 一轮采集中排在后面的账号会等待超时
+        print(f"[{domain}] 限额 (每分钟 {rate_per_minute} 次，突发 {burst} 次) 不足以在 "
+              f"{DEFAULT_MAX_WAIT} 秒内采集 {accounts} 个账号，请在 rate_limits 中提高")
+        _warned.add(domain)
+    return rate_per_minute / 60.0, burst
+
+
+def _connect(db_file):
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    # 手动控制事务，BEGIN IMMEDIATE 在读取前就获得写锁，保证多个进程之间的读改写是原子的
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+    if db_file not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "domain TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+        _initialized.add(db_file)
+    return conn
+
+
+def _take(conn, domain, rate, burst, now):
+    """尝试取一个令牌，返回需要等待的秒数（0 表示已取得）"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            tokens = float(burst)
+        else:
+            # 按经过的时间补充令牌；时钟回拨时不补充
+            tokens = min(float(burst), row[0] + max(0.0, now - row[1]) * rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        conn.execute("INSERT OR REPLACE INTO buckets (domain, tokens, updated) VALUES (?, ?, ?)",
+                     (domain, tokens, now))
+        conn.execute("COMMIT")
+        return wait
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def acquire(url, max_wait=DEFAULT_MAX_WAIT, db_file=None, deadline=None):
+    """
+    请求 url 前调用，等待直到该域名有可用的令牌
+
+    参数:
+        url: 将要请求的地址（或域名）
+        max_wait: 最长等待秒数，超过时抛出 RateLimitExceeded
+        db_file: 限流状态数据库，默认为 DB_FILE
+        deadline: resilience.Deadline，等待超过剩余时间时抛出 resilience.DeadlineExceeded
+
+    返回:
+        float: 实际等待的秒数
+    """
+    domain = domain_of(url)
+    rate, burst = get_limit(domain)
+    start = time.time()
+    conn = _connect(db_file or DB_FILE)
+    try:
+        while True:
+            now = time.time()
+            wait = _take(conn, domain, rate, burst, now)
+            if wait <= 0:
+                waited = now - start
+                if waited >= 1:
+                    print(f"[{domain}] 限流等待 {waited:.1f} 秒")
+                return waited
+            if now - start + wait > max_wait:
+                raise RateLimitExceeded(f"{domain} 请求过于频繁，{max_wait} 秒内没有可用的请求额度")
+            # 其他进程可能在此期间取走令牌，醒来后重新检查
+            if deadline is not None:
+                deadline.sleep(wait, f"{domain} 限流等待")
+            else:
+                time.sleep(wait)
+    finally:
+        conn.close()
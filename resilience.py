@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+容错模块 - 有限次数的指数退避重试、按平台的熔断器和采集的时间预算
+
+提取器用 retry() 包装页面请求，临时错误按带随机抖动的指数退避重试，总等待时间有上限。
+采集器用 guarded_call() 包装整个平台的采集：连续失败达到阈值后熔断器打开，
+在冷却时间内直接跳过该平台；冷却结束后只放行一次试探，成功则恢复，失败则加倍冷却时间。
+调度器给每次采集一个 Deadline，提取器在每个等待点检查它，预算用完或被取消时抛出 DeadlineExceeded。
+本机原因导致的失败（LocalLimitError、采集被取消）不说明平台出错，熔断器不计为失败。
+"""
+
+import time
+import random
+import threading
+from collections import namedtuple
+
+# attempts: 最多尝试次数；base_delay/max_delay: 第 n 次重试前最多等待 min(max_delay, base_delay * 2^n) 秒
+RetryPolicy = namedtuple("RetryPolicy", ["attempts", "base_delay", "max_delay"])
+
+# 直接请求页面的平台：失败很快，可以多试几次
+HTTP_RETRY = RetryPolicy(attempts=3, base_delay=1.0, max_delay=8.0)
+# 浏览器平台：每次尝试开销大，少试几次
+BROWSER_RETRY = RetryPolicy(attempts=2, base_delay=5.0, max_delay=20.0)
+
+# 熔断器默认参数
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 10 * 60
+DEFAULT_MAX_RESET_TIMEOUT = 2 * 60 * 60
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 菜单中显示的状态名称
+STATE_NAMES = {
+    CLOSED: "正常",
+    OPEN: "熔断",
+    HALF_OPEN: "试探中",
+}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被跳过"""
+
+
+class DeadlineExceeded(Exception):
+    """采集超出时间预算或被取消"""
+
+    # 是否因为采集被取消（例如调度器停止）
+    cancelled = False
+
+
+class LocalLimitError(Exception):
+    """本机的限制（例如请求额度用完）导致采集没有进行，不说明平台出错"""
+
+
+class Deadline:
+    """
+    一次采集的截止时间，可以被其他线程取消
+
+    提取器在每个等待点调用 check()，或用 timeout()/sleep() 让等待不超过剩余时间。
+    预算第一次用完的位置和时间记录在 exceeded_where/exceeded_at 中。
+    """
+
+    def __init__(self, seconds=None):
+        """seconds 为 None 时没有截止时间，只能被取消"""
+        self.seconds = seconds
+        self.expires = None if seconds is None else time.monotonic() + seconds
+        self._cancelled = threading.Event()
+        self.exceeded_where = None
+        self.exceeded_at = None
+
+    def remaining(self):
+        """剩余秒数，没有截止时间时返回 None"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def cancel(self):
+        """取消采集，正在 sleep() 的线程立即醒来"""
+        self._cancelled.set()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def expired(self):
+        return self.cancelled() or (self.expires is not None and time.monotonic() >= self.expires)
+
+    def exceeded(self, where):
+        """记录预算在 where 用完，返回要抛出的异常"""
+        if self.exceeded_where is None:
+            self.exceeded_where = where
+            self.exceeded_at = time.time()
+        reason = "已取消" if self.cancelled() else f"超出时间预算 ({self.seconds:g}秒)"
+        error = DeadlineExceeded(f"{where}: 采集{reason}")
+        error.cancelled = self.cancelled()
+        return error
+
+    def check(self, where):
+        """等待点：预算已用完或已取消时抛出 DeadlineExceeded"""
+        if self.expired():
+            raise self.exceeded(where)
+
+    def timeout(self, default, where):
+        """等待点的超时时间：不超过剩余时间"""
+        self.check(where)
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def sleep(self, seconds, where):
+        """可以被取消的 time.sleep()，剩余时间不够时等到截止时间后抛出 DeadlineExceeded"""
+        self.check(where)
+        remaining = self.remaining()
+        if remaining is not None and seconds > remaining:
+            self._cancelled.wait(remaining)
+            raise self.exceeded(where)
+        if self._cancelled.wait(seconds):
+            raise self.exceeded(where)
+
+
+def backoff_delay(attempt, policy):
+    """第 attempt 次重试（从0开始）前的等待时间，在 0 到指数上限之间随机取值"""
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** attempt)))
+
+
+def is_local_failure(error):
+    """错误是否由本机原因导致（本机限流、采集被取消），而不是平台出错"""
+    return isinstance(error, LocalLimitError) or (isinstance(error, DeadlineExceeded) and error.cancelled)
+
+
+def is_transient(error):
+    """判断错误是否值得重试：HTTP 4xx（429 除外）说明请求本身有问题，重试没有意义"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+def retry(func, *args, policy=HTTP_RETRY, retry_on=(Exception,), retry_if=is_transient, deadline=None, **kwargs):
+    """
+    调用 func，遇到 retry_on 中的临时错误时按指数退避重试
+
+    最后一次失败的异常会原样抛出；指定 deadline 时退避等待不会超过截止时间，
+    DeadlineExceeded 和 LocalLimitError 不会被重试
+    """
+    deadline = deadline or Deadline()
+    for attempt in range(policy.attempts):
+        try:
+            return func(*args, **kwargs)
+        except retry_on as e:
+            if isinstance(e, (DeadlineExceeded, LocalLimitError)) or attempt == policy.attempts - 1 or not retry_if(e):
+                raise
+            delay = backoff_delay(attempt, policy)
+            print(f"请求失败 ({e})，{delay:.1f}秒后重试 ({attempt + 1}/{policy.attempts - 1})")
+            deadline.sleep(delay, "重试等待")
+
+
+class CircuitBreaker:
+    """单个平台的熔断器"""
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, max_reset_timeout=DEFAULT_MAX_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self.skipped = 0
+        self.trips = 0
+
+    def allow(self):
+        """是否允许这次调用；冷却结束后的第一次调用作为试探放行"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                print(f"[{self.name}] 熔断冷却结束，放行一次试探请求")
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[{self.name}] 试探成功，熔断器恢复")
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # 试探失败，冷却时间加倍
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def record_neutral(self):
+        """调用因本机原因没有完成，不改变失败计数；试探没有完成时下次调用重新试探"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        print(f"[{self.name}] 连续失败 {self.failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+
+    def retry_in(self):
+        """熔断器打开时距离下次试探的秒数"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self):
+        """当前状态，供菜单和统计使用"""
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": retry_in,
+                "skipped": self.skipped,
+                "trips": self.trips,
+            }
+
+    def describe(self):
+        """状态的简短文字说明"""
+        return describe_snapshot(self.snapshot())
+
+
+def describe_snapshot(snapshot):
+    """熔断器状态（snapshot() 的结果）的简短文字说明"""
+    text = STATE_NAMES[snapshot["state"]]
+    if snapshot["state"] == OPEN:
+        text += f"，{max(1, round(snapshot['retry_in'] / 60))}分钟后重试"
+    elif snapshot["failures"]:
+        text += f"，连续失败{snapshot['failures']}次"
+    return text
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name):
+    """按名称（平台）获取熔断器，不存在时创建"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_states():
+    """所有熔断器的状态"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {item.name: item.snapshot() for item in breakers}
+
+
+def guarded_call(name, func, *args, succeeded=bool, **kwargs):
+    """
+    通过熔断器调用 func
+
+    熔断器打开时抛出 CircuitOpenError 而不调用 func；func 抛出异常或
+    succeeded(返回值) 为假时记为一次失败，本机原因的异常（见 is_local_failure）除外
+    """
+    circuit = breaker(name)
+    if not circuit.allow():
+        raise CircuitOpenError(f"{name} 已熔断，{circuit.retry_in():.0f}秒后重试")
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        if is_local_failure(e):
+            circuit.record_neutral()
+        else:
+            circuit.record_failure()
+        raise
+    if succeeded(result):
+        circuit.record_success()
+    else:
+        circuit.record_failure()
+    return result
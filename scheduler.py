@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+调度模块 - 按各自的间隔、优先级和随机抖动调度各平台的采集任务
+
+任务在有界线程池中执行，同一任务不会并发执行；每个分组（例如 HTTP 平台和浏览器平台）
+有单独的并发上限，不同分组互不阻塞。
+
+start() 启动唯一的调度线程，它在条件变量上一直睡眠到下一个任务到期，
+添加任务、修改间隔、手动触发或任务结束时立即被唤醒，空闲时不会定期醒来检查。
+
+设置了时间预算的任务每次执行时得到一个 resilience.Deadline（deadline 参数），
+截止时间取任务的预算和采集间隔中较短的一个，避免一次执行拖到下一个周期；
+预算用完的时间和位置记录在任务统计中。shutdown() 会取消正在执行的任务的截止时间。
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import resilience
+
+# 默认的工作线程数
+DEFAULT_MAX_WORKERS = 3
+# 没有设置上限的分组同一时间只执行一个任务
+DEFAULT_GROUP_LIMIT = 1
+# 计算吞吐量的时间窗口（秒）
+THROUGHPUT_WINDOW = 10 * 60
+# 默认的间隔随机抖动比例，避免多个任务总在同一时刻请求
+DEFAULT_JITTER = 0.1
+
+
+class Job:
+    """一个周期性任务"""
+
+    def __init__(self, name, func, interval, priority=0, jitter=DEFAULT_JITTER, group=None, budget=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        # 数值越小越优先
+        self.priority = priority
+        self.jitter = jitter
+        self.group = group
+        # 单次执行的时间预算（秒），为 None 时 func 不接收 deadline 参数
+        self.budget = budget
+        self.deadline = None
+
+        # 新任务立即到期
+        self.next_run = 0.0
+        self.last_run = None
+        self.running = False
+
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self.last_error = None
+        # 超出时间预算的次数，以及最近一次超出的时间和位置
+        self.overruns = 0
+        self.last_overrun = None
+
+    def next_delay(self):
+        """下次执行前的等待时间（带随机抖动）"""
+        if not self.jitter:
+            return self.interval
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class Scheduler:
+    """周期性任务调度器，start() 后自动执行到期的任务，也可以手动调用 run_due()"""
+
+    def __init__(self, max_workers=None, group_limits=None):
+        """
+        参数:
+            max_workers: 工作线程数，默认为各分组上限之和
+            group_limits: {分组: 同时执行的任务数上限}
+        """
+        self.group_limits = dict(group_limits or {})
+        if max_workers is None:
+            max_workers = sum(self.group_limits.values()) or DEFAULT_MAX_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="collector")
+        self._lock = threading.Lock()
+        # 调度状态变化时通知调度线程
+        self._changed = threading.Condition(self._lock)
+        self._jobs = {}
+        # 各分组正在执行的任务数
+        self._group_running = {}
+        # 最近完成的任务的时间，用于计算吞吐量
+        self._completed = deque()
+        self._created = time.monotonic()
+        self._thread = None
+        self._stopped = False
+
+    def add_job(self, name, func, interval, priority=0, jitter=DEFAULT_JITTER, group=None, budget=None):
+        """
+        添加或替换任务，新任务在下一次 run_due() 时执行
+
+        指定 budget（秒）时 func 以 func(deadline=...) 调用
+        """
+        job = Job(name, func, interval, priority, jitter, group, budget)
+        with self._lock:
+            self._jobs[name] = job
+            self._changed.notify_all()
+        return job
+
+    def remove_job(self, name):
+        with self._lock:
+            self._jobs.pop(name, None)
+            self._changed.notify_all()
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def set_interval(self, name, interval):
+        """修改任务间隔，下次执行时间按上次执行时间重新计算"""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None:
+                return
+            job.interval = interval
+            if job.last_run is not None:
+                job.next_run = job.last_run + job.next_delay()
+            self._changed.notify_all()
+
+    def trigger(self, name=None):
+        """让指定任务（默认为全部任务）在下一次 run_due() 时执行"""
+        with self._lock:
+            for job in self._jobs.values():
+                if name is None or job.name == name:
+                    job.next_run = 0.0
+            self._changed.notify_all()
+
+    def submit(self, func):
+        """在工作线程中执行一次性的任务"""
+        return self._executor.submit(func)
+
+    def run_due(self, now=None):
+        """提交所有到期的任务，返回提交的任务数"""
+        now = time.monotonic() if now is None else now
+        submitted = []
+        with self._lock:
+            due = [job for job in self._jobs.values() if not job.running and job.next_run <= now]
+            due.sort(key=lambda job: (job.priority, job.next_run))
+            for job in due:
+                if self._group_full(job.group):
+                    # 分组已达到并发上限，保持到期状态，等同组任务结束后再执行
+                    continue
+                job.running = True
+                job.last_run = now
+                job.next_run = now + job.next_delay()
+                if job.budget is not None:
+                    # 预算不超过采集间隔，这次执行不会占用下一个周期
+                    job.deadline = resilience.Deadline(min(job.budget, job.interval))
+                if job.group is not None:
+                    self._group_running[job.group] = self._group_running.get(job.group, 0) + 1
+                submitted.append(job)
+
+        for job in submitted:
+            self._executor.submit(self._run, job)
+        return len(submitted)
+
+    def _group_full(self, group):
+        if group is None:
+            return False
+        return self._group_running.get(group, 0) >= self.group_limits.get(group, DEFAULT_GROUP_LIMIT)
+
+    def _run(self, job):
+        start = time.monotonic()
+        deadline = job.deadline
+        try:
+            if deadline is not None:
+                job.func(deadline=deadline)
+            else:
+                job.func()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"任务 {job.name} 执行出错: {e}")
+        finally:
+            # shutdown() 取消的任务不算超出预算
+            if deadline is not None and deadline.expired() and not deadline.cancelled():
+                self._record_overrun(job, deadline)
+            with self._lock:
+                job.running = False
+                job.deadline = None
+                job.runs += 1
+                job.last_duration = time.monotonic() - start
+                if job.group is not None:
+                    self._group_running[job.group] -= 1
+                self._completed.append(time.monotonic())
+                # 任务已经超时到期或同组任务在等待时，需要调度线程马上处理
+                self._changed.notify_all()
+
+    def _record_overrun(self, job, deadline):
+        # 任务没有在等待点检查截止时间时，只能记录为执行结束时超出
+        where = deadline.exceeded_where or "执行结束时"
+        at = deadline.exceeded_at or time.time()
+        job.overruns += 1
+        job.last_overrun = {"time": at, "where": where}
+        print(f"任务 {job.name} 超出时间预算 ({deadline.seconds:g}秒): {where}")
+
+    def _seconds_until_next(self, now):
+        # 正在执行的任务和等待同组任务结束的任务不计入，它们结束时会通知调度线程
+        pending = [job.next_run for job in self._jobs.values()
+                   if not job.running and not self._group_full(job.group)]
+        if not pending:
+            return None
+        return max(0.0, min(pending) - now)
+
+    def seconds_until_next(self, now=None):
+        """距离下一个可执行的任务到期的秒数，没有任务时返回 None"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._seconds_until_next(now)
+
+    def start(self):
+        """启动调度线程，重复调用时不会启动第二个线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stopped = False
+            self._thread = threading.Thread(target=self._dispatch, name="scheduler")
+            self._thread.daemon = True
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=None):
+        """停止调度线程，不等待正在执行的任务"""
+        with self._lock:
+            self._stopped = True
+            self._changed.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _dispatch(self):
+        """调度线程：睡眠到下一个任务到期或调度状态变化"""
+        while True:
+            with self._lock:
+                while not self._stopped:
+                    delay = self._seconds_until_next(time.monotonic())
+                    if delay is not None and delay <= 0:
+                        break
+                    # 没有任务时无限期等待，直到被通知
+                    self._changed.wait(delay)
+                if self._stopped:
+                    return
+            self.run_due()
+
+    def throughput(self, window=THROUGHPUT_WINDOW):
+        """最近 window 秒内（刚启动时为启动以来）平均每分钟完成的任务数"""
+        now = time.monotonic()
+        with self._lock:
+            while self._completed and self._completed[0] < now - window:
+                self._completed.popleft()
+            count = len(self._completed)
+        elapsed = min(window, now - self._created)
+        return count * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        """各任务的执行统计"""
+        with self._lock:
+            return {
+                job.name: {
+                    "interval": job.interval,
+                    "priority": job.priority,
+                    "group": job.group,
+                    "running": job.running,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_duration": job.last_duration,
+                    "last_error": job.last_error,
+                    "budget": job.budget,
+                    "overruns": job.overruns,
+                    "last_overrun": job.last_overrun,
+                }
+                for job in self._jobs.values()
+            }
+
+    def shutdown(self, wait=False):
+        """停止调度，已开始的任务在下一个等待点被取消"""
+        self.stop()
+        with self._lock:
+            for job in self._jobs.values():
+                if job.deadline is not None:
+                    job.deadline.cancel()
+            self._jobs.clear()
+        self._executor.shutdown(wait=wait)
@@ -14,6 +14,21 @@ DEFAULT_SETTINGS = {
     "update_interval_name": "30分钟",  # 默认更新间隔名称
     "focus_mode": False,  # 专注模式是否启用
     "last_update": None,  # 最后更新时间
+    "event_stream_port": 8765,  # 事件流服务端口（分析页面实时更新）
+    "platform_intervals": {},  # 各平台单独的更新间隔（秒），未设置的平台使用 update_interval
+    "platform_budgets": {},  # 各平台单次采集的时间预算（秒），默认 HTTP 平台 60 秒、浏览器平台 180 秒，且不超过采集间隔
+    "http_slots": 4,  # 同时采集的 HTTP 平台账号数
+    "browser_slots": 1,  # 同时采集的浏览器平台账号数（每个需要一个浏览器）
+    "adaptive_interval": False,  # 是否按数据变化自动调整各平台的采集间隔
+    "adaptive_min_interval": 60,  # 自适应模式的最短间隔（秒）
+    "adaptive_max_interval": 4 * 60 * 60,  # 自适应模式的最长间隔（秒）
+    "adaptive_metrics": {},  # 各平台判断数据是否变化的指标，未设置的平台使用粉丝数
+    "rate_limits": {},  # 按域名的请求限额，例如 {"blog.csdn.net": {"rate_per_minute": 6, "burst": 3}}，"default" 为其他域名的限额
+    "daemon_poll_interval": 30,  # 采集守护进程在运行时，菜单栏应用读取其最新数据的间隔（秒）
+    "browser_max_pages": 50,  # 每个浏览器工作进程打开多少个页面后回收
+    "browser_max_rss_mb": 1024,  # 浏览器工作进程（包括浏览器）的内存上限（MB），超过后回收
+    "browser_task_timeout": 5 * 60,  # 单次浏览器采集的超时（秒），超时的工作进程被结束
+    "browser_idle_timeout": 5 * 60,  # 浏览器空闲多久后关闭（秒），下次采集浏览器平台时重新启动；0 为不关闭
 }
 
 # 设置文件路径
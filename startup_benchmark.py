@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启动性能测试 - 测量菜单栏应用从启动到显示菜单的时间，并输出导入耗时最多的模块
+
+每次测量在新的 Python 进程中进行：导入 menu_bar_app 并创建 StatisticsMenuBarApp
+（不开始采集，不进入事件循环）。以下情况返回非零退出码：
+
+    - 导入加创建的时间（多次测量的中位数）超过预算
+    - 启动过程中加载了应该按需导入的模块（提取器、requests、BeautifulSoup、DrissionPage、分析页面）
+
+用法: python startup_benchmark.py [--budget-ms 500] [--runs 5] [--top 15]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# 从启动到显示菜单的时间预算（毫秒）
+DEFAULT_BUDGET_MS = 500
+DEFAULT_RUNS = 5
+# 导入耗时报告中显示的模块数
+DEFAULT_TOP = 15
+
+# 第一次使用时才应该导入的模块
+LAZY_MODULES = ["csdn", "juejin", "toutiao", "zhihu", "requests", "bs4", "lxml", "DrissionPage", "data_analysis"]
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 在子进程中执行：测量导入和创建应用的时间，输出 JSON
+_MEASURE_CODE = """
+import sys, time, json
+start = time.perf_counter()
+import menu_bar_app
+imported = time.perf_counter()
+import event_stream, scheduler
+# 只测量到菜单可以显示为止，不开始采集
+scheduler.Scheduler.start = lambda self: None
+app = menu_bar_app.StatisticsMenuBarApp()
+created = time.perf_counter()
+loaded = [name for name in %r if name in sys.modules]
+app.scheduler.shutdown()
+event_stream.stop_server()
+print(json.dumps({"import_ms": (imported - start) * 1000, "init_ms": (created - imported) * 1000, "loaded": loaded}))
+"""
+
+
+def measure_startup():
+    """在新进程中测量一次启动，返回 {"import_ms", "init_ms", "loaded"}"""
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE_CODE % (LAZY_MODULES,)],
+        cwd=APP_DIR, capture_output=True, text=True, check=True)
+    # 应用启动时会输出日志，结果在最后一行
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def importtime_report(module="menu_bar_app", top=DEFAULT_TOP):
+    """
+    用 python -X importtime 统计导入 module 时各模块的耗时
+
+    返回:
+        list: [(累计耗时微秒, 自身耗时微秒, 模块名)]，按累计耗时从大到小排列，最多 top 项
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        # 格式: "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except (IndexError, ValueError):
+            # 标题行
+            continue
+        entries.append((cumulative_us, self_us, fields[2].strip()))
+    entries.sort(reverse=True)
+    return entries[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量菜单栏应用的启动时间")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="启动时间预算（毫秒）")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="测量次数，取中位数")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="导入耗时报告显示的模块数")
+    args = parser.parse_args()
+
+    print(f"导入 menu_bar_app 耗时最多的 {args.top} 个模块（累计 / 自身，毫秒）:")
+    for cumulative_us, self_us, name in importtime_report(top=args.top):
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+    runs = [measure_startup() for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    init_ms = statistics.median(run["init_ms"] for run in runs)
+    total_ms = statistics.median(run["import_ms"] + run["init_ms"] for run in runs)
+    print(f"\n启动时间（{args.runs} 次的中位数）: 导入 {import_ms:.1f} 毫秒，创建菜单 {init_ms:.1f} 毫秒，"
+          f"共 {total_ms:.1f} 毫秒 (预算 {args.budget_ms:g} 毫秒)")
+
+    failed = False
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    if loaded:
+        print(f"启动时加载了应该按需导入的模块: {', '.join(loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("启动时间超出预算")
+        failed = True
+    if not failed:
+        print("启动时间在预算内")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,14 +7,18 @@
 """
 
 from DrissionPage import ChromiumOptions, ChromiumPage, errors
-import time
 import os
 import sys
 import re
 import platform
 import random
 from bs4 import BeautifulSoup
-import datetime
+import data_store
+import rate_limit
+import resilience
+
+# 页面加载的最长等待时间（秒），有截止时间时取两者中较短的
+PAGE_LOAD_TIMEOUT = 30
 
 def init_browser():
     """
@@ -61,18 +65,33 @@ def init_browser():
         print(traceback.format_exc())
         return None
 
-def parse_toutiao_user_stats(url: str, page=None):
+def _load_page(page, url, deadline):
+    """访问页面并等待加载完成，超时抛出 errors.TimeoutError，超出 deadline 抛出 resilience.DeadlineExceeded"""
+    rate_limit.acquire(url, deadline=deadline)
+    page.get(url, timeout=deadline.timeout(PAGE_LOAD_TIMEOUT, "打开页面"))
+
+    # 增强等待机制
+    print("等待页面加载完成...")
+    page.wait.doc_loaded(timeout=deadline.timeout(PAGE_LOAD_TIMEOUT, "等待页面加载"))
+
+    # 等待页面上某个可能的固定元素出现
+    page.wait.ele_displayed('body', timeout=deadline.timeout(10, "等待页面元素"))
+
+def parse_toutiao_user_stats(url: str, page=None, account=None, deadline=None):
     """
     使用DrissionPage获取头条用户页面并解析用户数据
     
     参数:
         url: 头条用户页面URL
         page: 已初始化的ChromiumPage实例，如果为None则创建新实例
+        account: 数据保存到的账号，为None时为默认账号
+        deadline: resilience.Deadline，每个等待点都不会超过截止时间，超出时抛出 resilience.DeadlineExceeded
         
     返回:
         dict: 包含用户数据的字典
     """
     browser_created_here = False
+    deadline = deadline or resilience.Deadline()
     
     try:
         # 如果没有传入浏览器实例，创建新实例
@@ -83,22 +102,12 @@ def parse_toutiao_user_stats(url: str, page=None):
                 return None
 
         print("正在访问头条用户页面...")
-        # 访问页面
-        page.get(url)
-
-        # 增强等待机制
-        print("等待页面加载完成...")
-        page.wait.doc_loaded()
-
-        # 检查页面是否已加载成功
+        # 访问页面，加载超时时按退避重试
         try:
-            # 等待页面上某个可能的固定元素出现
-            page.wait.ele_displayed('body', timeout=10)
+            resilience.retry(_load_page, page, url, deadline, policy=resilience.BROWSER_RETRY,
+                             retry_on=(errors.TimeoutError,), deadline=deadline)
         except errors.TimeoutError:
-            print("页面加载超时，正在重试...")
-            page.refresh()
-            time.sleep(3)
-            page.wait.doc_loaded()
+            print("页面加载超时，尝试解析已加载的内容...")
 
         # 执行一些随机滚动，模拟真实用户行为
         print("模拟页面交互...")
@@ -107,18 +116,23 @@ def parse_toutiao_user_stats(url: str, page=None):
                 # 使用try-except来确保页面交互稳定
                 try:
                     # 随机滚动页面
+                    deadline.check("模拟页面交互")
                     scroll_amount = random.randint(100, 300)
                     page.run_js(f"window.scrollBy(0, {scroll_amount});")
                     # 添加随机等待，避免操作过快
-                    time.sleep(random.uniform(0.3, 0.8))
+                    deadline.sleep(random.uniform(0.3, 0.8), "模拟页面交互")
                 except errors.ContextLostError:
                     print("页面刷新中，等待页面重新加载...")
-                    time.sleep(0.2)
-                    page.wait.doc_loaded()
-                    time.sleep(0.1)
+                    deadline.sleep(0.2, "等待页面刷新")
+                    page.wait.doc_loaded(timeout=deadline.timeout(PAGE_LOAD_TIMEOUT, "等待页面刷新"))
+                    deadline.sleep(0.1, "等待页面刷新")
+                except resilience.DeadlineExceeded:
+                    raise
                 except Exception as e:
                     print(f"滚动操作失败: {e}")
-                    time.sleep(0.1)
+                    deadline.sleep(0.1, "模拟页面交互")
+        except resilience.DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"滚动页面时出错: {e}")
             # 继续执行，不中断流程
@@ -155,25 +169,17 @@ def parse_toutiao_user_stats(url: str, page=None):
         print(f"粉丝数: {fans}")
         print(f"关注数: {follows}")
 
+        # 一次采集只取一次时间，保存的数据行和返回的数据使用同一个时间
+        ts = data_store.now_epoch()
+
         # 检查是否所有数据都获取成功并且大于0
         data_complete = all(x != "未找到" for x in [likes, fans, follows]) and all(int(x) > 0 for x in [likes, fans, follows] if x.isdigit())
-        
+        quarantined = []
+
         if data_complete:
-            # 确保data目录存在
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # 构建CSV文件路径
-            csv_file = os.path.join(data_dir, 'toutiao_stats.csv')
-            
-            # 检查文件是否存在
-            file_exists = os.path.isfile(csv_file)
-            
             # 将数据保存到CSV文件
-            with open(csv_file, 'a', encoding='utf-8') as f:
-                if not file_exists:
-                    f.write("更新时间,获赞数,粉丝数,关注数\n")
-                f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{likes},{fans},{follows}\n")
+            csv_file, quarantined = data_store.append_sample(
+                "toutiao", {"likes": likes, "fans": fans, "follows": follows}, ts, account=account)
 
             print(f"\n数据已保存到 {os.path.abspath(csv_file)}")
         else:
@@ -185,6 +191,7 @@ def parse_toutiao_user_stats(url: str, page=None):
 
             try:
                 # 使用页面的JavaScript获取数据，添加错误处理
+                deadline.check("从JS提取数据")
                 js_user_data = page.run_js("""
                 try {
                     // 尝试获取全局变量中的用户数据
@@ -238,21 +245,9 @@ def parse_toutiao_user_stats(url: str, page=None):
                         all_greater_than_zero = all(int(x) > 0 for x in [likes, fans, follows])
                         
                         if all_greater_than_zero:
-                            # 确保data目录存在
-                            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-                            os.makedirs(data_dir, exist_ok=True)
-                            
-                            # 构建CSV文件路径
-                            csv_file = os.path.join(data_dir, 'toutiao_stats.csv')
-                            
-                            # 检查文件是否存在
-                            file_exists = os.path.isfile(csv_file)
-                            
                             # 将数据保存到CSV文件
-                            with open(csv_file, 'a', encoding='utf-8') as f:
-                                if not file_exists:
-                                    f.write("更新时间,获赞数,粉丝数,关注数\n")
-                                f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{likes},{fans},{follows}\n")
+                            csv_file, quarantined = data_store.append_sample(
+                                "toutiao", {"likes": likes, "fans": fans, "follows": follows}, ts, account=account)
                             
                             print(f"\n数据已通过JS方法获取并保存到 {os.path.abspath(csv_file)}")
                             
@@ -287,13 +282,18 @@ def parse_toutiao_user_stats(url: str, page=None):
 
         # 返回数据字典
         return {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": ts,
+            "timestamp": data_store.format_timestamp(ts),
             "likes": likes if likes != "未找到" else "0",
             "fans": fans if fans != "未找到" else "0",
             "follows": follows if follows != "未找到" else "0",
             "site": "今日头条",
-            "data_complete": data_complete
+            "data_complete": data_complete,
+            "quarantined": quarantined
         }
+    except (resilience.DeadlineExceeded, resilience.LocalLimitError):
+        # 超时或取消、本机限流时不返回不完整的数据，让熔断器区分头条出错和本机原因
+        raise
     except Exception as e:
         print(f"解析头条用户数据时出错: {e}")
         import traceback
@@ -307,8 +307,10 @@ def parse_toutiao_user_stats(url: str, page=None):
             except:
                 pass
                 
+        ts = data_store.now_epoch()
         return {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": ts,
+            "timestamp": data_store.format_timestamp(ts),
             "likes": "0",
             "fans": "0",
             "follows": "0",
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+界面更新模块 - 把后台线程中的菜单修改转到主线程执行，并跳过没有变化的修改
+
+AppKit 只允许在主线程中修改菜单，而采集在调度器的工作线程中完成。工作线程通过
+UIUpdater.set_title() 提交新标题，同一个菜单项在下次刷新前的多次修改只保留最后一次；
+标题与已显示的相同时不唤醒主线程，也不写入菜单。
+"""
+
+import threading
+
+try:
+    # rumps 依赖 PyObjC，在 macOS 上总是可用
+    from PyObjCTools.AppHelper import callAfter
+except ImportError:
+    callAfter = None
+
+
+def _call_now(func):
+    func()
+
+
+class UIUpdater:
+    """合并、去重并在主线程中应用菜单标题的修改"""
+
+    def __init__(self, dispatch=None):
+        # dispatch(func) 安排 func 在主线程中执行，默认为 PyObjC 的 callAfter，没有 PyObjC 时直接执行
+        self._dispatch = dispatch or callAfter or _call_now
+        self._lock = threading.Lock()
+        # id(对象) -> 已显示的标题
+        self._rendered = {}
+        # id(对象) -> (对象, 待显示的标题)
+        self._pending = {}
+        # 待在主线程中执行的函数
+        self._calls = []
+        self._scheduled = False
+        self.writes = 0
+        self.skipped = 0
+
+    def set_title(self, target, title):
+        """修改菜单项（或应用）的标题，可以在任何线程中调用"""
+        key = id(target)
+        with self._lock:
+            pending = self._pending.get(key)
+            current = pending[1] if pending is not None else self._rendered.get(key)
+            if current == title:
+                self.skipped += 1
+                return
+            self._pending[key] = (target, title)
+            schedule = self._mark_scheduled()
+        self._run_or_dispatch(schedule)
+
+    def call(self, func, *args):
+        """在主线程中执行 func(*args)，已在主线程中时立即执行"""
+        with self._lock:
+            self._calls.append((func, args))
+            schedule = self._mark_scheduled()
+        self._run_or_dispatch(schedule)
+
+    def _mark_scheduled(self):
+        """调用时持有锁，返回是否需要安排一次刷新"""
+        if self._scheduled:
+            return False
+        self._scheduled = True
+        return True
+
+    def _run_or_dispatch(self, schedule):
+        if threading.current_thread() is threading.main_thread():
+            # 菜单回调和定时器已经在主线程中，不需要等下一轮事件循环
+            self.flush()
+        elif schedule:
+            self._dispatch(self.flush)
+
+    def flush(self):
+        """在主线程中执行待执行的函数并应用待显示的标题"""
+        with self._lock:
+            calls, self._calls = self._calls, []
+            self._scheduled = False
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"更新菜单时出错: {e}")
+
+        # 执行的函数可能又修改了标题，最后统一应用
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, (target, title) in pending.items():
+            with self._lock:
+                if self._rendered.get(key) == title:
+                    # 改回了已显示的标题
+                    self.skipped += 1
+                    continue
+                self._rendered[key] = title
+                self.writes += 1
+            target.title = title
@@ -11,14 +11,24 @@ Extract specific statistics from a Zhihu user profile page:
 """
 
 import re
-import time
 import os
-import csv
 import json
-from datetime import datetime
 from bs4 import BeautifulSoup
+import data_store
+import rate_limit
+import resilience
 
-def extract_zhihu_stats(url, page=None, html_content=None):
+# Longest wait for a page load in seconds; the deadline may shorten it
+PAGE_LOAD_TIMEOUT = 30
+
+
+def _navigate(page, url, deadline):
+    """Wait for the domain's request budget, then load the page within the deadline"""
+    rate_limit.acquire(url, deadline=deadline)
+    page.get(url, timeout=deadline.timeout(PAGE_LOAD_TIMEOUT, "open page"))
+
+
+def extract_zhihu_stats(url, page=None, html_content=None, account=None, deadline=None):
     """
     Extract user statistics from a Zhihu user profile page
 
@@ -26,21 +36,28 @@ def extract_zhihu_stats(url, page=None, html_content=None):
         url (str): URL of the Zhihu profile page
         page: Optional existing browser instance
         html_content: Optional HTML content string (for testing or offline use)
+        account: Account the stats are saved under (the default account when None)
+        deadline: Optional resilience.Deadline bounding every wait; resilience.DeadlineExceeded
+            is raised once it runs out
 
     Returns:
         dict: Dictionary containing extracted statistics
     """
+    ts = data_store.now_epoch()
     stats = {
+        'ts': ts,
         'upvotes': 0,
         'likes': 0,
         'collections': 0,
         'following': 0,
         'followers': 0,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'timestamp': data_store.format_timestamp(ts),
         'site': 'Zhihu',
-        'data_complete': False
+        'data_complete': False,
+        'quarantined': []
     }
 
+    deadline = deadline or resilience.Deadline()
     try:
         # If HTML content is provided directly, use that
         if html_content:
@@ -59,10 +76,10 @@ def extract_zhihu_stats(url, page=None, html_content=None):
                     print("DrissionPage not installed, please install it first.")
                     return stats
 
-            # Navigate to the URL
+            # Navigate to the URL, retrying with backoff if navigation fails
             print(f"Navigating to Zhihu URL: {url}")
-            page.get(url)
-            time.sleep(3)  # Allow JavaScript to load
+            resilience.retry(_navigate, page, url, deadline, policy=resilience.BROWSER_RETRY, deadline=deadline)
+            deadline.sleep(3, "wait for scripts")  # Allow JavaScript to load
             
             # Save source code to file (optional)
             html_content = page.html
@@ -142,42 +159,23 @@ def extract_zhihu_stats(url, page=None, html_content=None):
             except Exception as e:
                 print(f"Failed to extract stats from full HTML content: {e}")
             
-        # Save data to CSV file
-        try:
-            # 确保data目录存在
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # 构建CSV文件路径
-            csv_file = os.path.join(data_dir, 'zhihu_stats.csv')
-            file_exists = os.path.isfile(csv_file)
-
-            with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow([
-                        'timestamp', 'upvotes', 'likes', 'collections',
-                        'following', 'followers'
-                    ])
-
-                writer.writerow([
-                    stats['timestamp'],
-                    stats['upvotes'],
-                    stats['likes'],
-                    stats['collections'],
-                    stats['following'],
-                    stats['followers']
-                ])
-                print(f"Saved Zhihu stats to {csv_file}")
-                
-        except Exception as e:
-            print(f"Failed to save data to files: {e}")
-
         # Mark data as complete if we have all the required data
         if stats['upvotes'] > 0 and stats['likes'] > 0 and stats['collections'] > 0 and stats['following'] > 0 and stats['followers'] > 0:
             stats['data_complete'] = True
             print(f"Zhihu data complete: {stats['upvotes']} upvotes, {stats['likes']} likes, {stats['collections']} collections, {stats['following']} following, {stats['followers']} followers")
 
+            # Save data to CSV file (incomplete data is not saved)
+            try:
+                csv_file, stats['quarantined'] = data_store.append_sample("zhihu", stats, ts, account=account)
+                print(f"Saved Zhihu stats to {csv_file}")
+            except Exception as e:
+                print(f"Failed to save data to files: {e}")
+        else:
+            print("Zhihu data incomplete, not saved")
+
+    except (resilience.DeadlineExceeded, resilience.LocalLimitError):
+        # Out of budget, cancelled or held back by our own rate limit: not a Zhihu failure
+        raise
     except Exception as e:
         print(f"Error extracting Zhihu stats: {e}")
         import traceback
@@ -204,8 +202,10 @@ def parse_html_file(html_file_path):
     
     except Exception as e:
         print(f"Error parsing HTML file: {e}")
+        ts = data_store.now_epoch()
         return {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": ts,
+            "timestamp": data_store.format_timestamp(ts),
             "followers": 0,
             "site": "Zhihu",
             "data_complete": False